@@ -1,151 +1,186 @@
-import re
-
-"""
-message_splitter.py - Implementation of the message splitting functionality
-"""
-
-def split_message(text, max_lines=3, max_chars_per_line=100):
-    """
-    The main message splitting function, used throughout the application.
-    This is just an alias to keep backwards compatibility.
-    """
-    return split_message_impl(text, max_lines, max_chars_per_line)
-
-def split_message_impl(text, max_lines=3, max_chars_per_line=100):
-    """
-    Split a long message into smaller chunks for better WhatsApp readability.
-    This improved implementation properly handles long lines without newlines.
-    
-    Args:
-        text: The text to split
-        max_lines: Maximum lines per message chunk
-        max_chars_per_line: Maximum characters per line
-        
-    Returns:
-        List of message chunks ready to send
-    """
-    if not text:
-        return []
-    
-    # Convert escaped newlines and normalize line endings
-    normalized_text = text.replace('\\n', '\n').replace('\r\n', '\n')
-    
-    # Remove standalone backslashes using regex
-    normalized_text = re.sub(r'\n\s*\\\s*\n', '\n', normalized_text)
-    normalized_text = re.sub(r'^\s*\\\s*\n', '', normalized_text)
-    normalized_text = re.sub(r'\n\s*\\\s*$', '', normalized_text)
-    
-    # Split by existing newlines
-    paragraphs = normalized_text.split('\n')
-    chunks = []
-    current_chunk = []
-    current_line_count = 0
-    
-    for paragraph in paragraphs:
-        # Handle empty paragraphs
-        if not paragraph.strip():
-            if current_line_count >= max_lines:
-                if current_chunk:
-                    chunks.append('\n'.join(current_chunk))
-                    current_chunk = []
-                    current_line_count = 0
-            
-            if current_line_count < max_lines:
-                current_chunk.append('')
-                current_line_count += 1
-            continue
-        
-        # For paragraphs longer than max_chars_per_line, break them up
-        if len(paragraph) > max_chars_per_line:
-            words = paragraph.split()
-            
-            # Special case: single very long word
-            if len(words) == 1:
-                word = words[0]
-                for i in range(0, len(word), max_chars_per_line):
-                    if current_line_count >= max_lines:
-                        if current_chunk:
-                            chunks.append('\n'.join(current_chunk))
-                        current_chunk = []
-                        current_line_count = 0
-                    current_chunk.append(word[i:i+max_chars_per_line])
-                    current_line_count += 1
-                continue
-            
-            # Regular case: paragraph with multiple words
-            current_line = []
-            current_length = 0
-            
-            for word in words:
-                # Handle very long words
-                if len(word) > max_chars_per_line:
-                    # Add accumulated words first
-                    if current_line:
-                        if current_line_count >= max_lines:
-                            if current_chunk:
-                                chunks.append('\n'.join(current_chunk))
-                            current_chunk = []
-                            current_line_count = 0
-                        current_chunk.append(' '.join(current_line))
-                        current_line_count += 1
-                        current_line = []
-                        current_length = 0
-                    
-                    # Split the long word
-                    for i in range(0, len(word), max_chars_per_line):
-                        if current_line_count >= max_lines:
-                            if current_chunk:
-                                chunks.append('\n'.join(current_chunk))
-                            current_chunk = []
-                            current_line_count = 0
-                        current_chunk.append(word[i:i+max_chars_per_line])
-                        current_line_count += 1
-                
-                # Normal word handling
-                elif current_length + len(word) + (1 if current_line else 0) > max_chars_per_line:
-                    # Finalize current line
-                    if current_line:
-                        if current_line_count >= max_lines:
-                            if current_chunk:
-                                chunks.append('\n'.join(current_chunk))
-                            current_chunk = []
-                            current_line_count = 0
-                        current_chunk.append(' '.join(current_line))
-                        current_line_count += 1
-                    
-                    # Start new line with this word
-                    current_line = [word]
-                    current_length = len(word)
-                
-                else:
-                    # Word fits on current line
-                    if current_line:
-                        current_length += 1  # space
-                    current_line.append(word)
-                    current_length += len(word)
-            
-            # Add the last line if it exists
-            if current_line:
-                if current_line_count >= max_lines:
-                    if current_chunk:
-                        chunks.append('\n'.join(current_chunk))
-                    current_chunk = []
-                    current_line_count = 0
-                current_chunk.append(' '.join(current_line))
-                current_line_count += 1
-        
-        else:
-            # Paragraph fits on one line
-            if current_line_count >= max_lines:
-                if current_chunk:
-                    chunks.append('\n'.join(current_chunk))
-                current_chunk = []
-                current_line_count = 0
-            current_chunk.append(paragraph)
-            current_line_count += 1
-    
-    # Add the final chunk
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
-    
-    return chunks
\ No newline at end of file
+import bisect
+import functools
+import io
+import re
+
+from message_splitter_numba import pack_lines as _numba_pack_lines
+
+"""
+message_splitter.py - Implementation of the message splitting functionality
+"""
+
+# Precompiled patterns so the hot path doesn't re-parse pattern strings on
+# every call. The backslash pattern fuses the three former re.sub passes
+# (leading, trailing, and mid-text standalone backslashes) into one scan;
+# the replacement keeps a newline only for the mid-text case. Adjacent
+# standalone-backslash lines cascade — removing one can expose another at
+# an edge — so _strip_backslashes repeats the pass to a fixpoint.
+_NEWLINE_RE = re.compile(r'\\n|\r\n|\r')
+_BACKSLASH_RE = re.compile(r'(^\s*\\\s*\n)|(\n\s*\\\s*$)|\n\s*\\\s*\n')
+_WORD_RE = re.compile(r'\S+')
+
+def _backslash_repl(match):
+    """Replacement for _BACKSLASH_RE: drop edge matches, keep one newline mid-text."""
+    if match.group(1) or match.group(2):
+        return ''
+    return '\n'
+
+def _strip_backslashes(text):
+    """Remove standalone-backslash lines, repeating the fused pass until
+    nothing changes. Runs of adjacent standalone backslashes cascade (each
+    removal can expose the next at an edge), and the fixpoint removes them
+    all; typical inputs converge in one or two passes. Only called when
+    the text still contains a backslash, so the common case never loops.
+    """
+    while True:
+        stripped = _BACKSLASH_RE.sub(_backslash_repl, text)
+        if stripped == text or '\\' not in stripped:
+            return stripped
+        text = stripped
+
+@functools.lru_cache(maxsize=512)
+def _split_cached(text, max_lines, max_chars_per_line):
+    """Memoized split for repeated template texts (welcome/help/error replies)."""
+    return split_message_impl(text, max_lines, max_chars_per_line)
+
+def split_message(text, max_lines=3, max_chars_per_line=100):
+    """
+    The main message splitting function, used throughout the application.
+    Results are memoized per (text, max_lines, max_chars_per_line) and
+    returned as an immutable tuple, so cache hits share the same object
+    safely across threads without a defensive copy. Tests can reset the
+    cache via _split_cached.cache_clear().
+    """
+    return _split_cached(text, max_lines, max_chars_per_line)
+
+def _iter_lines(normalized_text, max_chars_per_line):
+    """
+    Yield the display lines of normalized text, one paragraph at a time.
+
+    Blank paragraphs yield a single empty line; paragraphs longer than
+    max_chars_per_line are broken into slices of the original string.
+    """
+    for paragraph in normalized_text.split('\n'):
+        # Classify the paragraph in one pass: isspace() runs in C and avoids
+        # the throwaway string that .strip() would allocate
+        length = len(paragraph)
+        if length == 0 or paragraph.isspace():
+            yield ''
+            continue
+
+        if length <= max_chars_per_line:
+            # Paragraph fits on one line
+            yield paragraph
+            continue
+
+        # Use the Numba-compiled scanner when available (ASCII text and
+        # numba installed)
+        offsets = _numba_pack_lines(paragraph, max_chars_per_line)
+        if offsets is not None:
+            for start, end in offsets:
+                yield paragraph[start:end]
+            continue
+
+        # Pure-Python path: binary-search the maximal run of words that
+        # fits on each line instead of walking the words one at a time
+        starts = []
+        ends = []
+        for m in _WORD_RE.finditer(paragraph):
+            starts.append(m.start())
+            ends.append(m.end())
+
+        i = 0
+        word_count = len(starts)
+        while i < word_count:
+            start = starts[i]
+            # Largest j such that words i..j fit within the line limit
+            j = bisect.bisect_right(ends, start + max_chars_per_line) - 1
+            if j < i:
+                # Even the single word overflows: hard-slice it in one
+                # comprehension instead of an append-per-slice loop
+                word_end = ends[i]
+                yield from [paragraph[k:min(k + max_chars_per_line, word_end)]
+                            for k in range(start, word_end, max_chars_per_line)]
+                i += 1
+            else:
+                yield paragraph[start:ends[j]]
+                i = j + 1
+
+def split_message_iter(text, max_lines=3, max_chars_per_line=100):
+    """
+    Lazily yield message chunks for the given text.
+
+    The first chunk is available as soon as max_lines lines have been
+    packed, so callers interleaving sends with I/O don't wait for the
+    whole text to be processed, and peak memory is one chunk.
+
+    Args:
+        text: The text to split
+        max_lines: Maximum lines per message chunk
+        max_chars_per_line: Maximum characters per line
+
+    Yields:
+        Message chunks ready to send
+    """
+    if not text:
+        return
+
+    # Fast path: most bot messages fit in a single chunk. When the text has
+    # no newlines (literal or escaped) and is within the line limit,
+    # normalization is the identity and no wrapping is needed.
+    if (len(text) <= max_chars_per_line and '\n' not in text
+            and '\\' not in text and '\r' not in text):
+        yield text
+        return
+
+    # Convert escaped newlines and normalize line endings; when the text has
+    # neither a backslash nor a carriage return, normalization is the
+    # identity and the pass can be skipped. The common escaped-only case
+    # uses str.replace, a single C pass cheaper than the regex engine;
+    # carriage returns need the full pattern.
+    if '\r' in text:
+        normalized_text = _NEWLINE_RE.sub('\n', text)
+    elif '\\' in text:
+        normalized_text = text.replace('\\n', '\n')
+    else:
+        normalized_text = text
+
+    # Remove standalone backslashes with the precompiled pattern. Real bot
+    # messages almost never contain a backslash once \n escapes have been
+    # converted, so a cheap membership check skips the regex entirely.
+    if '\\' in normalized_text:
+        normalized_text = _strip_backslashes(normalized_text)
+
+    # Build each chunk in a single growable StringIO buffer with inline
+    # newline separators, instead of a list that '\n'.join rescans on flush
+    buf = io.StringIO()
+    current_line_count = 0
+
+    for line in _iter_lines(normalized_text, max_chars_per_line):
+        if current_line_count >= max_lines:
+            yield buf.getvalue()
+            buf = io.StringIO()
+            current_line_count = 0
+        if current_line_count:
+            buf.write('\n')
+        buf.write(line)
+        current_line_count += 1
+
+    # Yield the final chunk
+    if current_line_count:
+        yield buf.getvalue()
+
+def split_message_impl(text, max_lines=3, max_chars_per_line=100):
+    """
+    Split a long message into smaller chunks for better WhatsApp readability.
+    Materializes split_message_iter for callers that need the full sequence.
+
+    Args:
+        text: The text to split
+        max_lines: Maximum lines per message chunk
+        max_chars_per_line: Maximum characters per line
+
+    Returns:
+        Tuple of message chunks ready to send (immutable, safe to share)
+    """
+    return tuple(split_message_iter(text, max_lines, max_chars_per_line))
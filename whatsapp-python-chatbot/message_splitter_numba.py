@@ -0,0 +1,112 @@
+"""
+message_splitter_numba.py - Optional Numba-accelerated line packing
+
+Provides a JIT-compiled version of the long-paragraph line packer used by
+message_splitter.split_message_impl. The jitted state machine scans the
+UTF-8 bytes of a paragraph and returns (start, end) line offsets, which
+the caller slices back out of the original string.
+
+Numba is an optional dependency: if it (or numpy) is not installed, or
+the paragraph is not pure ASCII (where byte offsets differ from character
+offsets), pack_lines returns None and the caller falls back to the
+pure-Python path.
+"""
+
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _pack_lines_impl(buf, max_chars):
+        """Scan ASCII bytes and emit (start, end) offsets for packed lines.
+
+        Mirrors the pure-Python offset walker: words are runs of
+        non-whitespace bytes, lines are filled greedily up to max_chars,
+        and over-long words are hard-sliced at max_chars boundaries.
+        """
+        n = buf.shape[0]
+        out = np.empty((n if n > 0 else 1, 2), dtype=np.int64)
+        count = 0
+        line_start = -1
+        line_end = -1
+        i = 0
+
+        while i < n:
+            c = buf[i]
+            # Whitespace bytes: space (32) and \t\n\v\f\r (9-13)
+            if c == 32 or (9 <= c <= 13):
+                i += 1
+                continue
+
+            # Scan to the end of the current word
+            start = i
+            while i < n:
+                c = buf[i]
+                if c == 32 or (9 <= c <= 13):
+                    break
+                i += 1
+            end = i
+
+            if end - start > max_chars:
+                # Flush any pending line, then hard-slice the long word.
+                # The remainder is emitted as its own line, matching the
+                # pure-Python walker, which never merges later words onto
+                # a sliced word's tail.
+                if line_start != -1:
+                    out[count, 0] = line_start
+                    out[count, 1] = line_end
+                    count += 1
+                    line_start = -1
+                while end - start > max_chars:
+                    out[count, 0] = start
+                    out[count, 1] = start + max_chars
+                    count += 1
+                    start += max_chars
+                if end > start:
+                    out[count, 0] = start
+                    out[count, 1] = end
+                    count += 1
+            elif line_start == -1:
+                line_start = start
+                line_end = end
+            elif end - line_start > max_chars:
+                out[count, 0] = line_start
+                out[count, 1] = line_end
+                count += 1
+                line_start = start
+                line_end = end
+            else:
+                line_end = end
+
+        if line_start != -1:
+            out[count, 0] = line_start
+            out[count, 1] = line_end
+            count += 1
+
+        return out[:count]
+
+
+def pack_lines(paragraph, max_chars):
+    """
+    Pack a long paragraph into lines using the jitted scanner.
+
+    Args:
+        paragraph: The paragraph text (no embedded newlines)
+        max_chars: Maximum characters per line
+
+    Returns:
+        A list of (start, end) offsets into paragraph, or None when the
+        accelerated path is unavailable and the caller should fall back.
+    """
+    if not NUMBA_AVAILABLE or not paragraph.isascii():
+        return None
+
+    buf = np.frombuffer(paragraph.encode('ascii'), dtype=np.uint8)
+    offsets = _pack_lines_impl(buf, max_chars)
+    return [(int(s), int(e)) for s, e in offsets]
@@ -3,6 +3,7 @@ run_all_tests.py - A comprehensive test runner script with detailed output
 """
 
 import os
+import re
 import sys
 import subprocess
 import argparse
@@ -16,23 +17,47 @@ def setup_env():
     """Setup the environment for testing."""
     print(f"{Fore.BLUE}Setting up test environment...{Style.RESET_ALL}")
     
-    # Install test dependencies
+    # Install test dependencies, regular requirements, and the test runner's
+    # own colorama in one pip invocation so the resolver runs once
     print("Installing test dependencies...")
-    subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements-dev.txt"], 
-                   capture_output=True)
-    
-    # Make sure regular requirements are installed too
     print("Installing regular requirements...")
-    subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"],
-                   capture_output=True)
-    
-    # Additional requirements for the test runner
     print("Installing colorama for test output...")
-    subprocess.run([sys.executable, "-m", "pip", "install", "colorama"],
+    subprocess.run([sys.executable, "-m", "pip", "install",
+                    "-r", "requirements-dev.txt",
+                    "-r", "requirements.txt",
+                    "colorama"],
                    capture_output=True)
-    
+
     print(f"{Fore.GREEN}Environment setup complete!{Style.RESET_ALL}")
 
+# Single precompiled scan for pytest status tokens, replacing up to five
+# substring searches per output line
+_STATUS_RE = re.compile(r'\b(PASSED|FAILED|SKIPPED|XFAIL|ERROR)\b')
+
+# Map of pytest status tokens to the color they are printed in
+_STATUS_COLORS = {
+    "PASSED": Fore.GREEN,
+    "FAILED": Fore.RED,
+    "SKIPPED": Fore.YELLOW,
+    "XFAIL": Fore.YELLOW,
+    "ERROR": Fore.RED,
+}
+
+# Constant suffix so colored lines need no per-line string formatting
+_RESET_NL = Style.RESET_ALL + '\n'
+
+def _colorize_and_print(line):
+    """Print a single pytest output line with status-based coloring."""
+    match = _STATUS_RE.search(line)
+    write = sys.stdout.write
+    if match:
+        write(_STATUS_COLORS[match.group(1)])
+        write(line)
+        write(_RESET_NL)
+    else:
+        write(line)
+        write('\n')
+
 def run_tests(coverage=False, verbose=False, pattern=None, stop_on_failure=False):
     """Run the tests with the specified options."""
     print(f"{Fore.BLUE}Running tests...{Style.RESET_ALL}")
@@ -58,40 +83,32 @@ def run_tests(coverage=False, verbose=False, pattern=None, stop_on_failure=False
     cmd.append("--no-header")
     cmd.append("-v")
     
-    # Run the tests
+    # Run the tests, streaming output as it arrives instead of buffering
+    # the whole run in memory before anything is shown. stderr is merged
+    # into stdout: reading the two pipes sequentially can deadlock once
+    # the child fills the unread stderr pipe (e.g. a long collection
+    # traceback), and the colorizer handles arbitrary lines anyway.
     start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    elapsed_time = time.time() - start_time
-    
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, bufsize=1)
+
     # Display results
     print(f"\n{Fore.YELLOW}Test Output:{Style.RESET_ALL}")
-    
-    # Process and colorize the output
-    if result.stdout:
-        for line in result.stdout.splitlines():
-            if "PASSED" in line:
-                print(f"{Fore.GREEN}{line}{Style.RESET_ALL}")
-            elif "FAILED" in line:
-                print(f"{Fore.RED}{line}{Style.RESET_ALL}")
-            elif "SKIPPED" in line or "XFAIL" in line:
-                print(f"{Fore.YELLOW}{line}{Style.RESET_ALL}")
-            elif "ERROR" in line:
-                print(f"{Fore.RED}{line}{Style.RESET_ALL}")
-            else:
-                print(line)
-    
-    # Print errors separately for better visibility
-    if result.returncode != 0 and result.stderr:
-        print(f"\n{Fore.RED}Errors:{Style.RESET_ALL}")
-        print(result.stderr)
-    
+
+    # Process and colorize the output line by line
+    for line in proc.stdout:
+        _colorize_and_print(line.rstrip('\n'))
+
+    returncode = proc.wait()
+    elapsed_time = time.time() - start_time
+
     # Print summary
-    if result.returncode == 0:
+    if returncode == 0:
         print(f"\n{Fore.GREEN}✅ All tests passed in {elapsed_time:.2f} seconds!{Style.RESET_ALL}")
     else:
         print(f"\n{Fore.RED}❌ Some tests failed. Execution time: {elapsed_time:.2f} seconds.{Style.RESET_ALL}")
     
-    return result.returncode
+    return returncode
 
 def print_header():
     """Print a formatted header for the test run."""
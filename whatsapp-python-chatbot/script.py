@@ -1,16 +1,31 @@
 import os
 import logging
-from flask import Flask, request, jsonify
+from logging.handlers import MemoryHandler, RotatingFileHandler
+import re
+from flask import Flask, request, jsonify, Response
 from dotenv import load_dotenv
 import google.generativeai as genai
 import json
+
+# orjson parses and serializes JSON several times faster than the stdlib;
+# fall back to json when it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from wasenderapi import create_sync_wasender, WasenderSyncClient
 from wasenderapi.errors import WasenderAPIError
 from wasenderapi.webhook import WasenderWebhookEvent
 from wasenderapi.models import RetryConfig
 import asyncio
+import atexit
+import collections
+import queue
+import random
+import threading
 import time
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, lru_cache, wraps
 from message_splitter import split_message
 
 # Load environment variables
@@ -19,13 +34,39 @@ load_dotenv()
 # Flask application setup
 app = Flask(__name__)
 
-# Configure logging
+if orjson is not None:
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonProvider(DefaultJSONProvider):
+        """App-level JSON provider backed by orjson.
+
+        Every jsonify/get_json in the app goes through the Rust encoder
+        instead of the stdlib one, and responses skip key sorting.
+        """
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
+# Configure logging. File records go through a MemoryHandler so the webhook
+# path is not charged a write+flush syscall per log line; the buffer drains
+# every 200 records, immediately on ERROR, and at shutdown.
+_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+_file_handler = RotatingFileHandler('whatsapp_bot.log', maxBytes=10_000_000, backupCount=3)
+# MemoryHandler.flush formats records via its target, not via the format
+# basicConfig applies to the MemoryHandler itself, so the file handler
+# needs the formatter set explicitly
+_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+    format=_LOG_FORMAT,
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler('whatsapp_bot.log')
+        MemoryHandler(capacity=200, flushLevel=logging.ERROR, target=_file_handler)
     ]
 )
 logger = logging.getLogger("whatsapp_bot")
@@ -42,12 +83,19 @@ CONFIG = {
     "MESSAGE_CHUNK_MAX_CHARS": int(os.getenv('MESSAGE_CHUNK_MAX_CHARS', '100')),
     "MESSAGE_DELAY_MIN": float(os.getenv('MESSAGE_DELAY_MIN', '0.55')),
     "MESSAGE_DELAY_MAX": float(os.getenv('MESSAGE_DELAY_MAX', '1.5')),
+    # Opt-in: serve exact repeats of a user's message from a local cache
+    # instead of calling Gemini (ignores conversation context, so off by
+    # default)
+    "ENABLE_RESPONSE_CACHE": os.getenv('ENABLE_RESPONSE_CACHE', 'false').lower() in ('1', 'true', 'yes'),
+    # Opt-in: fan chunk sends out to a thread pool instead of pacing them
+    # with human-like delays (chunks may arrive out of order)
+    "PARALLEL_SEND": os.getenv('PARALLEL_SEND', 'false').lower() in ('1', 'true', 'yes'),
 }
 
 # Directory for storing conversations
 if not os.path.exists(CONFIG["CONVERSATIONS_DIR"]):
     os.makedirs(CONFIG["CONVERSATIONS_DIR"])
-    logger.info(f"Created conversations directory at {CONFIG['CONVERSATIONS_DIR']}")
+    logger.info("Created conversations directory at %s", CONFIG['CONVERSATIONS_DIR'])
 
 # Configure retry options for WaSenderAPI
 retry_config = RetryConfig(
@@ -64,9 +112,42 @@ try:
     )
     logger.info("WaSenderAPI client initialized successfully with retry support")
 except Exception as e:
-    logger.error(f"Error initializing WaSenderAPI client: {e}", exc_info=True)
+    logger.error("Error initializing WaSenderAPI client: %s", e, exc_info=True)
     wasender_client = None
 
+# The SDK's sync client issues every call through bare requests.request,
+# which opens a fresh TCP+TLS connection per send. Route its HTTP through
+# a shared pooled session so consecutive chunk sends reuse keepalive
+# connections instead of paying the handshake each time.
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from types import SimpleNamespace
+    import wasenderapi.sync_client as _wasender_sync_client
+
+    _wasender_session = requests.Session()
+    _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    _wasender_session.mount('https://', _adapter)
+    _wasender_session.mount('http://', _adapter)
+
+    def _pooled_request(**request_options):
+        # Pre-encode json= bodies with orjson into raw bytes, skipping
+        # requests' per-call stdlib json encoder
+        if orjson is not None and 'json' in request_options:
+            body = request_options.pop('json')
+            request_options['data'] = orjson.dumps(body)
+            headers = request_options.setdefault('headers', {})
+            headers.setdefault('Content-Type', 'application/json')
+        return _wasender_session.request(**request_options)
+
+    _wasender_sync_client.requests = SimpleNamespace(
+        request=_pooled_request,
+        exceptions=requests.exceptions,
+    )
+    logger.info("WaSender HTTP calls routed through a pooled session")
+except Exception as e:
+    logger.warning("Could not enable pooled HTTP session for WaSender client: %s", e)
+
 # Initialize Gemini client
 if CONFIG["GEMINI_API_KEY"]:
     genai.configure(api_key=CONFIG["GEMINI_API_KEY"])
@@ -77,12 +158,36 @@ else:
 @app.errorhandler(Exception)
 def handle_global_exception(e):
     """Global handler for unhandled exceptions."""
-    logger.error(f"Unhandled Exception: {e}", exc_info=True)
+    logger.error("Unhandled Exception: %s", e, exc_info=True)
     return jsonify(status='error', message='An internal server error occurred.'), 500
 
+# /health and /status are polled by uptime monitors far more often than
+# their answers change, so each serves a cached serialized body for a
+# short TTL instead of rebuilding and re-serializing per poll. Tests
+# clear this between cases via the autouse fixture in conftest.
+_PROBE_CACHE_TTL = 1.0
+_probe_cache = {}
+
+def _cached_probe(name):
+    """Return the cached (body, status) for a probe route, or None."""
+    hit = _probe_cache.get(name)
+    if hit is not None and time.monotonic() - hit[0] < _PROBE_CACHE_TTL:
+        return Response(hit[1], status=hit[2], mimetype='application/json')
+    return None
+
+def _store_probe(name, payload, status_code):
+    """Serialize and cache a probe payload; returns the Response."""
+    body = orjson.dumps(payload) if orjson else json.dumps(payload).encode()
+    _probe_cache[name] = (time.monotonic(), body, status_code)
+    return Response(body, status=status_code, mimetype='application/json')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring."""
+    cached = _cached_probe('health')
+    if cached is not None:
+        return cached
+
     status = {
         'status': 'ok',
         'wasender_client': wasender_client is not None,
@@ -90,27 +195,32 @@ def health_check():
         'conversations_dir': os.path.exists(CONFIG["CONVERSATIONS_DIR"]),
         'timestamp': time.time()
     }
-    
+
     if not wasender_client:
         status['status'] = 'degraded'
         status['issues'] = ['WaSender client not initialized']
-    
+
     if not CONFIG["GEMINI_API_KEY"]:
         status['status'] = 'degraded'
         if 'issues' not in status:
             status['issues'] = []
         status['issues'].append('Gemini API key not configured')
-    
+
     status_code = 200 if status['status'] == 'ok' else 503
-    return jsonify(status), status_code
+    return _store_probe('health', status, status_code)
 
 
 
 # --- Load Persona ---
+@cache
 def load_persona(file_path='persona.json'):
     """
     Load persona configuration from a JSON file.
     Returns a tuple of (persona_description, persona_name).
+
+    The result is memoized per path: the persona feeds the system
+    instruction baked into the Gemini model at startup, so the file is
+    read once and never consulted again on the request path.
     """
     default_name = "Assistant"
     default_description = "You are a helpful assistant."
@@ -122,132 +232,356 @@ def load_persona(file_path='persona.json'):
     )
 
     try:
-        if not os.path.exists(file_path):
-            logger.warning(f"Persona file not found at {file_path}. Using default persona.")
-            return f"{default_base_prompt}\n\n{default_description}", default_name
-            
+        # A single open doubles as the existence check (one syscall, not two)
         with open(file_path, 'r') as f:
             persona_data = json.load(f)
-            
+
         custom_description = persona_data.get('description', default_description)
         base_prompt = persona_data.get('base_prompt', default_base_prompt)
         persona_name = persona_data.get('name', default_name)
         
         full_persona = f"{base_prompt}\n\n{custom_description}"
-        logger.info(f"Successfully loaded persona: {persona_name}")
+        logger.info("Successfully loaded persona: %s", persona_name)
         
         return full_persona, persona_name
         
+    except FileNotFoundError:
+        logger.warning("Persona file not found at %s. Using default persona.", file_path)
+        return f"{default_base_prompt}\n\n{default_description}", default_name
     except json.JSONDecodeError:
-        logger.error(f"Error decoding JSON from {file_path}. Using default persona.")
+        logger.error("Error decoding JSON from %s. Using default persona.", file_path)
         return f"{default_base_prompt}\n\n{default_description}", default_name
     except Exception as e:
-        logger.error(f"An unexpected error occurred while loading persona: {e}. Using default persona.")
+        logger.error("An unexpected error occurred while loading persona: %s. Using default persona.", e)
         return f"{default_base_prompt}\n\n{default_description}", default_name
 
 # Load persona configuration
 PERSONA_FILE_PATH = os.getenv('PERSONA_FILE_PATH', 'persona.json')
 PERSONA_DESCRIPTION, PERSONA_NAME = load_persona(PERSONA_FILE_PATH)
-logger.info(f"Using persona '{PERSONA_NAME}'")
+logger.info("Using persona '%s'", PERSONA_NAME)
 # --- End Load Persona ---
 
 class ConversationManager:
-    """Manages conversation history with context window management."""
-    
+    """Manages conversation history with context window management.
+
+    Histories are cached in memory per user and validated against file
+    mtimes, so the common webhook path never re-parses JSON from disk.
+    New exchanges are persisted by appending single JSONL lines to a side
+    log ({user_id}.jsonl) next to the canonical {user_id}.json snapshot;
+    the log is folded back into the snapshot when it grows too large.
+    """
+
     def __init__(self, storage_dir, max_history=10):
         """
         Initialize the conversation manager.
-        
+
         Args:
             storage_dir: Directory to store conversation histories
             max_history: Maximum number of message pairs to retain in history
         """
         self.storage_dir = storage_dir
+        # Pre-join the trailing separator so per-call path building is one
+        # string concat instead of an os.path.join
+        self._prefix = os.path.join(storage_dir, '')
         self.max_history = max_history
-        
+        self._cache = {}
+        self._stats = {}
+        self._log_counts = {}
+        # Metadata index for bulk scans: user_id -> [stat key, message count].
+        # Loaded lazily on first use, persisted across restarts at exit.
+        self._index_path = os.path.join(storage_dir, '.index.json')
+        self._index = None
+        self._index_dirty = False
+        atexit.register(self._save_index)
+
+    def _snapshot_path(self, user_id):
+        return f"{self._prefix}{user_id}.json"
+
+    def _log_path(self, user_id):
+        return f"{self._prefix}{user_id}.jsonl"
+
+    @staticmethod
+    def _stat_key(*paths):
+        """Build a freshness key from the mtime/size of the given files."""
+        key = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                key.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                key.append(None)
+        return tuple(key)
+
+    @staticmethod
+    def _is_valid_history(history):
+        return isinstance(history, list) and all(
+            isinstance(item, dict) and 'role' in item and 'parts' in item
+            for item in history)
+
     def load(self, user_id):
         """
         Load conversation history for a given user_id with context window management.
-        
+
         Args:
             user_id: The user identifier
-            
+
         Returns:
             A list of message dictionaries suitable for Gemini
         """
-        file_path = os.path.join(self.storage_dir, f"{user_id}.json")
-        
-        try:
-            if not os.path.exists(file_path):
-                return []
-                
-            with open(file_path, 'r') as f:
-                history = json.load(f)
-                
-            # Validate history format
-            if not isinstance(history, list) or not all(
-                isinstance(item, dict) and 'role' in item and 'parts' in item 
-                for item in history):
-                logger.warning(f"Invalid history format in {file_path}. Starting fresh.")
-                return []
-                
-            # Limit history to most recent exchanges to prevent context overflow
+        file_path = self._snapshot_path(user_id)
+        log_path = self._log_path(user_id)
+
+        stat_key = self._stat_key(file_path, log_path)
+        if stat_key == (None, None):
+            # Both files are gone (e.g. /clear_history unlinked them):
+            # drop the cached deque too, or the next add_exchange would
+            # extend the stale history and resurrect the cleared thread
+            self._cache.pop(user_id, None)
+            self._stats.pop(user_id, None)
+            self._log_counts.pop(user_id, None)
+            return []
+
+        # Serve from the in-memory cache while the files are unchanged
+        if self._stats.get(user_id) != stat_key:
+            history = self._read_from_disk(user_id, file_path, log_path)
+
+            # Limit history to most recent exchanges to prevent context
+            # overflow: the bounded deque evicts old entries on append,
+            # so no per-load slicing is needed once cached
             if len(history) > self.max_history * 2:  # Each exchange is 2 messages (user + model)
-                logger.info(f"Trimming history for {user_id} to last {self.max_history} exchanges")
-                history = history[-self.max_history * 2:]
-                
-            return history
-                
+                logger.info("Trimming history for %s to last %s exchanges", user_id, self.max_history)
+            self._cache[user_id] = collections.deque(history, maxlen=self.max_history * 2)
+            self._stats[user_id] = stat_key
+
+        return list(self._cache[user_id])
+
+    def _read_from_disk(self, user_id, file_path, log_path):
+        """Parse the snapshot file and fold in any appended JSONL entries."""
+        history = []
+
+        try:
+            # EAFP: the open doubles as the existence check (one syscall)
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+
+            # A valid snapshot is always a JSON array; sniff the first
+            # non-whitespace byte so wrong-format files are rejected
+            # without parsing the whole blob
+            stripped = raw.lstrip()
+            if not stripped.startswith(b'['):
+                logger.warning("Invalid history format in %s. Starting fresh.", file_path)
+                history = []
+            else:
+                history = orjson.loads(stripped) if orjson else json.loads(stripped)
+
+                # Validate history format
+                if not self._is_valid_history(history):
+                    logger.warning("Invalid history format in %s. Starting fresh.", file_path)
+                    history = []
+
         except FileNotFoundError:
-            return []
-        except json.JSONDecodeError:
-            logger.error(f"Error decoding JSON from {file_path}. Starting fresh.")
-            return []
+            history = []
+        except ValueError:
+            logger.error("Error decoding JSON from %s. Starting fresh.", file_path)
+            history = []
         except Exception as e:
-            logger.error(f"Unexpected error loading history from {file_path}: {e}")
-            return []
-            
+            logger.error("Unexpected error loading history from %s: %s", file_path, e)
+            history = []
+
+        log_count = 0
+        try:
+            # Stream the log and keep only the tail that can still fit in
+            # the context window; older lines are counted but never decoded.
+            tail = collections.deque(maxlen=self.max_history * 2)
+            with open(log_path, 'r') as f:
+                for line in f:
+                    log_count += 1
+                    tail.append(line)
+            for line in tail:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = orjson.loads(line) if orjson else json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping corrupt history log line in %s", log_path)
+                    continue
+                if isinstance(entry, dict) and 'role' in entry and 'parts' in entry:
+                    history.append(entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Unexpected error loading history log from %s: %s", log_path, e)
+
+        self._log_counts[user_id] = log_count
+        return history
+
     def save(self, user_id, history):
         """
         Saves conversation history for a given user_id.
-        
+
+        Writes a full snapshot and retires the append log, making this the
+        compaction point for histories grown via add_exchange.
+
         Args:
             user_id: The user identifier
             history: The conversation history to save
         """
-        file_path = os.path.join(self.storage_dir, f"{user_id}.json")
-        
+        file_path = self._snapshot_path(user_id)
+        log_path = self._log_path(user_id)
+
+        # Truncate at write time so the on-disk snapshot never exceeds the
+        # context window: every later load then parses O(max_history) bytes
+        # no matter how old the conversation is
+        if len(history) > self.max_history * 2:
+            history = history[-self.max_history * 2:]
+
         try:
             # Ensure the directory exists
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            # Save the history
-            with open(file_path, 'w') as f:
-                json.dump(history, f, indent=2)
-                
+
+            # Write to a temp file and rename into place so a crash mid-write
+            # can never leave a truncated snapshot that load() would discard
+            tmp_path = file_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                if orjson:
+                    f.write(orjson.dumps(history))
+                else:
+                    f.write(json.dumps(history).encode('utf-8'))
+            os.replace(tmp_path, file_path)
+
+            # The snapshot now holds everything the log contained
+            if os.path.exists(log_path):
+                os.remove(log_path)
+
+            self._cache[user_id] = collections.deque(history, maxlen=self.max_history * 2)
+            self._stats[user_id] = self._stat_key(file_path, log_path)
+            self._log_counts[user_id] = 0
+
         except Exception as e:
-            logger.error(f"Error saving conversation history to {file_path}: {e}")
-    
+            logger.error("Error saving conversation history to %s: %s", file_path, e)
+
     def add_exchange(self, user_id, user_message, model_response):
         """
         Add a new message exchange to the conversation history.
-        
+
+        Appends the two new entries to the JSONL log (O(1) bytes written)
+        instead of rewriting the whole snapshot; compacts once the history
+        has outgrown the context window by a wide margin.
+
         Args:
             user_id: The user identifier
             user_message: The message from the user
             model_response: The response from the model
         """
-        history = self.load(user_id)
-        
-        # Add the new exchange
-        history.append({'role': 'user', 'parts': [user_message]})
-        history.append({'role': 'model', 'parts': [model_response]})
-        
-        # Save the updated history
-        self.save(user_id, history)
-        
+        self.load(user_id)
+
+        cache = self._cache.get(user_id)
+        if cache is None:
+            cache = collections.deque(maxlen=self.max_history * 2)
+            self._cache[user_id] = cache
+
+        # Add the new exchange; the bounded deque evicts old entries itself
+        new_entries = [
+            {'role': 'user', 'parts': [user_message]},
+            {'role': 'model', 'parts': [model_response]},
+        ]
+        cache.extend(new_entries)
+        history = list(cache)
+
+        log_count = self._log_counts.get(user_id, 0) + len(new_entries)
+        if log_count > self.max_history * 4:
+            # Periodic compaction: fold the log back into the snapshot
+            self.save(user_id, history)
+            return history
+
+        log_path = self._log_path(user_id)
+        try:
+            os.makedirs(self.storage_dir, exist_ok=True)
+            with open(log_path, 'ab') as f:
+                for entry in new_entries:
+                    if orjson:
+                        # OPT_APPEND_NEWLINE emits the trailing newline in the
+                        # same buffer instead of a second bytes concat
+                        f.write(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))
+                    else:
+                        f.write(json.dumps(entry).encode('utf-8') + b'\n')
+
+            self._stats[user_id] = self._stat_key(self._snapshot_path(user_id), log_path)
+            self._log_counts[user_id] = log_count
+        except Exception as e:
+            logger.error("Error appending conversation history to %s: %s", log_path, e)
+
         return history
 
+    def _index_key(self, user_id):
+        """Stat key for the index, in the JSON-roundtrippable list form."""
+        return [list(k) if k else None
+                for k in self._stat_key(self._snapshot_path(user_id), self._log_path(user_id))]
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'rb') as f:
+                raw = f.read()
+            index = orjson.loads(raw) if orjson else json.loads(raw)
+            if isinstance(index, dict):
+                return index
+        except (FileNotFoundError, ValueError):
+            pass
+        except Exception as e:
+            logger.error("Unexpected error loading conversation index: %s", e)
+        return {}
+
+    def _save_index(self):
+        if not self._index_dirty:
+            return
+        try:
+            with open(self._index_path, 'wb') as f:
+                payload = orjson.dumps(self._index) if orjson else json.dumps(self._index).encode('utf-8')
+                f.write(payload)
+            self._index_dirty = False
+        except FileNotFoundError:
+            # Storage dir vanished (e.g. a temp dir at shutdown) - nothing to persist
+            pass
+        except Exception as e:
+            logger.error("Error saving conversation index to %s: %s", self._index_path, e)
+
+    def list_users(self):
+        """
+        Enumerate stored conversations as {user_id: message_count}.
+
+        Backed by a persisted mtime-indexed cache, so a bulk scan only
+        re-parses files that changed since they were last indexed; on a
+        warm index this is one stat per user and no JSON decoding.
+        """
+        if self._index is None:
+            self._index = self._load_index()
+        index = self._index
+
+        try:
+            names = os.listdir(self.storage_dir)
+        except FileNotFoundError:
+            return {}
+
+        user_ids = {n[:-5] for n in names if n.endswith('.json') and not n.startswith('.')}
+        user_ids.update(n[:-6] for n in names if n.endswith('.jsonl'))
+
+        for user_id in user_ids:
+            key = self._index_key(user_id)
+            cached = index.get(user_id)
+            if cached and cached[0] == key:
+                continue
+            history = self._read_from_disk(
+                user_id, self._snapshot_path(user_id), self._log_path(user_id))
+            index[user_id] = [key, len(history)]
+            self._index_dirty = True
+
+        for stale in set(index) - user_ids:
+            del index[stale]
+            self._index_dirty = True
+
+        return {user_id: meta[1] for user_id, meta in index.items()}
+
 # Initialize the conversation manager
 conversation_manager = ConversationManager(CONFIG["CONVERSATIONS_DIR"], max_history=20)
 
@@ -280,16 +614,77 @@ class GeminiClient:
             raise ValueError("Gemini API key is required")
             
         genai.configure(api_key=api_key)
-        logger.info(f"Gemini client initialized with model: {model_name}")
-        
-    def generate_response(self, message_text, conversation_history=None):
+
+        # The model is built lazily on first use and then pinned, so worker
+        # processes that never serve a chat request skip the setup entirely
+        self._model = None
+        self._model_lock = threading.Lock()
+        # One ChatSession per user, so follow-up turns send only the new
+        # message instead of rehydrating the full history each call
+        self._chats = {}
+        self._chats_lock = threading.Lock()
+        logger.info("Gemini client initialized with model: %s", model_name)
+
+    @property
+    def model(self):
+        """The shared GenerativeModel, built once on first access.
+
+        Construction validates the system prompt and allocates config, so it
+        is done once under a lock; start_chat returns a fresh session per
+        call, making the pinned model safe to share across worker threads.
+        """
+        model = self._model
+        if model is None:
+            with self._model_lock:
+                model = self._model
+                if model is None:
+                    model = genai.GenerativeModel(
+                        self.model_name,
+                        system_instruction=self.system_instruction
+                    )
+                    self._model = model
+        return model
+
+    def reset_chat(self, user_id):
+        """Drop the pooled chat session for a user (e.g. on history clear)."""
+        with self._chats_lock:
+            self._chats.pop(user_id, None)
+
+    def _get_chat(self, user_id, conversation_history):
+        """Return the pooled ChatSession for user_id, creating it on first
+        use and rebuilding it when its transcript has diverged from the
+        persisted history.
+
+        Under multi-process deployments (the README's gunicorn workers)
+        turns served by other processes reach this one only through the
+        stored history, so a session whose transcript length no longer
+        matches the loaded history would silently drop that context.
+        """
+        expected_len = len(conversation_history or [])
+        with self._chats_lock:
+            chat = self._chats.get(user_id)
+            if chat is not None:
+                transcript = getattr(chat, 'history', None)
+                if isinstance(transcript, list) and len(transcript) != expected_len:
+                    chat = None
+            if chat is None:
+                if len(self._chats) >= 256:
+                    # Evict the oldest session to bound memory
+                    self._chats.pop(next(iter(self._chats)))
+                chat = self.model.start_chat(history=conversation_history or [])
+                self._chats[user_id] = chat
+        return chat
+
+    def generate_response(self, message_text, conversation_history=None, user_id=None):
         """
         Generate a response from Gemini using the provided message and optional history.
-        
+
         Args:
             message_text: The message to respond to
             conversation_history: Optional conversation history
-            
+            user_id: Optional user key; when given, a chat session is pooled
+                per user so only the incremental message is sent each turn
+
         Returns:
             The generated response text
         """
@@ -298,15 +693,15 @@ class GeminiClient:
             return "Sorry, I'm having trouble connecting to my brain right now (API key issue)."
 
         try:
-            # Create model with system instruction for persona
-            model = genai.GenerativeModel(
-                self.model_name, 
-                system_instruction=self.system_instruction
-            )
-            
-            logger.info(f"Sending prompt to Gemini (system persona active): {message_text[:200]}...")
+            # Reuse the lazily built shared model (persona is baked in)
+            model = self.model
 
-            if conversation_history:
+            logger.info("Sending prompt to Gemini (system persona active): %s...", message_text[:200])
+
+            if user_id:
+                chat = self._get_chat(user_id, conversation_history)
+                response = chat.send_message(message_text)
+            elif conversation_history:
                 # Use chat history if available
                 chat = model.start_chat(history=conversation_history)
                 response = chat.send_message(message_text)
@@ -322,14 +717,14 @@ class GeminiClient:
                 try:
                     return response.candidates[0].content.parts[0].text.strip()
                 except (IndexError, AttributeError, KeyError) as e:
-                    logger.error(f"Error parsing Gemini response candidates: {e}. Response: {response}")
+                    logger.error("Error parsing Gemini response candidates: %s. Response: %s", e, response)
                     return "I received an unusual response structure from Gemini. Please try again."
             else:
-                logger.error(f"Gemini API returned an empty or unexpected response: {response}")
+                logger.error("Gemini API returned an empty or unexpected response: %s", response)
                 return "I received an empty or unexpected response from Gemini. Please try again."
 
         except Exception as e:
-            logger.error(f"Error calling Gemini API: {e}", exc_info=True)
+            logger.error("Error calling Gemini API: %s", e, exc_info=True)
             return "I'm having trouble processing that request with my AI brain. Please try again later."
 
 # Initialize Gemini client if API key is available
@@ -342,9 +737,16 @@ if CONFIG["GEMINI_API_KEY"]:
             system_instruction=PERSONA_DESCRIPTION
         )
     except Exception as e:
-        logger.error(f"Failed to initialize Gemini client: {e}", exc_info=True)
+        logger.error("Failed to initialize Gemini client: %s", e, exc_info=True)
+
+# Exact-match LRU cache in front of Gemini, used only when
+# ENABLE_RESPONSE_CACHE is set: a dict hit is sub-microsecond against
+# hundreds of milliseconds for the API round trip
+_response_cache = collections.OrderedDict()
+_response_cache_lock = threading.Lock()
+_RESPONSE_CACHE_SIZE = 256
 
-def get_gemini_response(message_text, conversation_history=None):
+def get_gemini_response(message_text, conversation_history=None, user_id=None):
     """
     Generates a response from Gemini using the gemini_client.
     This wrapper maintains compatibility with the existing code.
@@ -352,143 +754,361 @@ def get_gemini_response(message_text, conversation_history=None):
     if not gemini_client:
         logger.error("Gemini client is not initialized.")
         return "Sorry, I'm having trouble connecting to my brain right now (API key issue)."
-    
-    return gemini_client.generate_response(message_text, conversation_history)
+
+    cache_key = None
+    if CONFIG["ENABLE_RESPONSE_CACHE"]:
+        cache_key = (user_id, message_text.strip().lower())
+        with _response_cache_lock:
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                _response_cache.move_to_end(cache_key)
+                return cached
+
+    response = gemini_client.generate_response(message_text, conversation_history, user_id=user_id)
+
+    if cache_key is not None and response:
+        with _response_cache_lock:
+            _response_cache[cache_key] = response
+            _response_cache.move_to_end(cache_key)
+            if len(_response_cache) > _RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+
+    return response
+
+_JID_SUFFIX = '@s.whatsapp.net'
+
+@lru_cache(maxsize=4096)
+def _normalize_recipient(recipient_number):
+    """Strip the personal-JID suffix ("@s.whatsapp.net") from a recipient id.
+
+    Only that suffix is removed; group ("@g.us"), "@lid", and broadcast
+    JIDs are passed through untouched, as the API expects them whole. A
+    bot talks to the same numbers over and over, so the memoized lookup
+    turns the check-and-slice into a dict hit after the first send.
+    """
+    if recipient_number.endswith(_JID_SUFFIX):
+        return recipient_number[:-len(_JID_SUFFIX)]
+    return recipient_number
+
+# Per-type send dispatch: one dict lookup replaces the if/elif chain, and
+# each entry binds the SDK call signature for its type
+_SEND_DISPATCH = {
+    'text': lambda client, to, content, url: client.send_text(
+        to=to, text_body=content),
+    'image': lambda client, to, content, url: client.send_image(
+        to=to, url=url, caption=content if content else None),
+    'video': lambda client, to, content, url: client.send_video(
+        to=to, url=url, caption=content if content else None),
+    'audio': lambda client, to, content, url: client.send_audio(
+        to=to, url=url),
+    'document': lambda client, to, content, url: client.send_document(
+        to=to, url=url, caption=content if content else None),
+}
 
 def send_whatsapp_message(recipient_number, message_content, message_type='text', media_url=None):
     """Sends a message via WaSenderAPI SDK. Supports text and media messages."""
     if not wasender_client:
         logger.error("WaSender API client is not initialized. Please check .env file.")
         return False
-    
-    # Sanitize recipient_number to remove "@s.whatsapp.net"
-    if recipient_number and "@s.whatsapp.net" in recipient_number:
-        formatted_recipient_number = recipient_number.split('@')[0]
+
+    handler = _SEND_DISPATCH.get(message_type)
+    if handler is None:
+        logger.error("Unsupported message type or missing content/media_url: %s", message_type)
+        return False
+    if message_type != 'text' and not media_url:
+        logger.error("Media URL is required for message type '%s'.", message_type)
+        return False
+
+    if recipient_number:
+        formatted_recipient_number = _normalize_recipient(recipient_number)
     else:
         formatted_recipient_number = recipient_number
-    
+
     try:
-        if message_type == 'text':
-            response = wasender_client.send_text(
-                to=formatted_recipient_number,
-                text_body=message_content
-            )
-            logger.info(f"Text message sent to {recipient_number}.")
-            return True
-        elif message_type == 'image' and media_url:
-            response = wasender_client.send_image(
-                to=formatted_recipient_number,
-                url=media_url,
-                caption=message_content if message_content else None
-            )
-            logger.info(f"Image message sent to {recipient_number}.")
-            return True
-        elif message_type == 'video' and media_url:
-            response = wasender_client.send_video(
-                to=formatted_recipient_number,
-                url=media_url,
-                caption=message_content if message_content else None
-            )
-            logger.info(f"Video message sent to {recipient_number}. ")
-            return True
-        elif message_type == 'audio' and media_url:
-            response = wasender_client.send_audio(
-                to=formatted_recipient_number,
-                url=media_url
-            )
-            logger.info(f"Audio message sent to {recipient_number}.")
-            return True
-        elif message_type == 'document' and media_url:
-            response = wasender_client.send_document(
-                to=formatted_recipient_number,
-                url=media_url,
-                caption=message_content if message_content else None
-            )
-            logger.info(f"Document message sent to {recipient_number}. ")
-            return True
-        else:
-            if message_type != 'text':
-                logger.error(f"Media URL is required for message type '{message_type}'.")
-                return False
-            logger.error(f"Unsupported message type or missing content/media_url: {message_type}")
-            return False
+        handler(wasender_client, formatted_recipient_number, message_content, media_url)
+        logger.info("%s message sent to %s.", message_type.capitalize(), recipient_number)
+        return True
     except WasenderAPIError as e:
-        logger.error(f"WaSenderAPI Error sending {message_type} to {recipient_number}: {e.message} (Status: {e.status_code})")
+        logger.error("WaSenderAPI Error sending %s to %s: %s (Status: %s)", message_type, recipient_number, e.message, e.status_code)
         return False
     except Exception as e:
-        logger.error(f"An unexpected error occurred while sending WhatsApp message: {e}")
+        logger.error("An unexpected error occurred while sending WhatsApp message: %s", e)
         return False
 
+# Maps any character that isn't plain alphanumeric to '_' when turning a
+# sender JID or user id into a safe filename; runs in C instead of a
+# per-character Python generator
+_SANITIZE_RE = re.compile(r'[^0-9A-Za-z]')
+
+# ASCII fast path for the same mapping: a fixed translate table built once,
+# so sanitizing a typical phone-number JID is a single C-level pass with no
+# regex machinery. Non-ASCII ids fall back to the regex so every
+# non-alphanumeric character is still replaced.
+_SANITIZE_TABLE = str.maketrans(
+    {chr(b): '_' for b in range(128) if not chr(b).isalnum()})
+
+def _sanitize_id(user_id):
+    """Reduce a sender JID or user id to a filesystem-safe name."""
+    if user_id.isascii():
+        return user_id.translate(_SANITIZE_TABLE)
+    return _SANITIZE_RE.sub('_', user_id)
+
+# Incoming messages are processed off the request thread so the webhook can
+# acknowledge immediately; WaSender retries webhooks that take too long.
+job_queue = queue.Queue(maxsize=int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000')))
+
+def _make_splitter(max_lines, max_chars_per_line):
+    """Bind the configured chunk limits as closure locals, so the hot path
+    does two LOAD_FASTs instead of CONFIG dict lookups per reply."""
+    def _split(message):
+        return split_message(message, max_lines, max_chars_per_line)
+    return _split
+
+# Specialized once at startup for the configured limits
+_split_reply = _make_splitter(CONFIG["MESSAGE_CHUNK_MAX_LINES"], CONFIG["MESSAGE_CHUNK_MAX_CHARS"])
+
+def process_incoming_message(sender_number, safe_sender_id, incoming_message_text):
+    """Generate a Gemini reply for one message and send it in paced chunks."""
+    conversation_history = load_conversation_history(safe_sender_id)
+    gemini_reply = get_gemini_response(incoming_message_text, conversation_history,
+                                       user_id=safe_sender_id)
+
+    if not gemini_reply:
+        return
+
+    message_chunks = _split_reply(gemini_reply)
+    print(f"Sending {len(message_chunks)} message chunks to {sender_number}")
+    # Strip the personal-JID suffix once instead of once per chunk; group
+    # and broadcast JIDs pass through whole
+    clean_sender = _normalize_recipient(sender_number)
+    if CONFIG.get("PARALLEL_SEND") and len(message_chunks) > 1:
+        # Overlap the per-chunk network latency; total time becomes roughly
+        # the slowest single send instead of the sum of all of them
+        with ThreadPoolExecutor(max_workers=min(len(message_chunks), 8)) as executor:
+            results = list(executor.map(
+                lambda chunk: send_whatsapp_message(clean_sender, chunk, message_type='text'),
+                message_chunks))
+        if not all(results):
+            logger.error("Failed to send one or more message chunks to %s", sender_number)
+    else:
+        for i, chunk in enumerate(message_chunks):
+            if not send_whatsapp_message(clean_sender, chunk, message_type='text'):
+                logger.error("Failed to send message chunk to %s", sender_number)
+                break
+            # Delay between messages
+            if i < len(message_chunks) - 1:
+                delay = random.uniform(5, 7)
+                time.sleep(delay)
+
+    # Save conversation history
+    conversation_manager.add_exchange(safe_sender_id, incoming_message_text, gemini_reply)
+
+# Turns for one user must never run concurrently: two workers sharing the
+# user's pooled ChatSession would interleave appends to its history, and
+# the conversation cache and JSONL log have the same hazard. A per-user
+# lock serializes same-user jobs while different users still fan out
+# across the pool.
+_user_locks = {}
+_user_locks_guard = threading.Lock()
+
+def _user_turn_lock(safe_sender_id):
+    """Return the lock serializing turns for one user, creating it lazily."""
+    with _user_locks_guard:
+        lock = _user_locks.get(safe_sender_id)
+        if lock is None:
+            lock = threading.Lock()
+            _user_locks[safe_sender_id] = lock
+        return lock
+
+def _worker_loop():
+    """Drain the job queue, one incoming message at a time."""
+    while True:
+        job = job_queue.get()
+        try:
+            # job is (sender_number, safe_sender_id, message_text)
+            with _user_turn_lock(job[1]):
+                process_incoming_message(*job)
+        except Exception as e:
+            logger.error("Error processing queued message: %s", e, exc_info=True)
+        finally:
+            job_queue.task_done()
+
+# A small pool so the 5-7s pacing sleeps of one conversation don't delay
+# replies to other users; each job still sends its own chunks in order
+_WORKER_COUNT = int(os.getenv('WEBHOOK_WORKERS', '4'))
+_worker_threads = [
+    threading.Thread(target=_worker_loop, name=f"webhook-worker-{i}", daemon=True)
+    for i in range(_WORKER_COUNT)
+]
+for _thread in _worker_threads:
+    _thread.start()
+
+# Fallback decoder for framed payloads: raw_decode consumes only the first
+# JSON object and ignores anything after it
+_JSON_DECODER = json.JSONDecoder()
+
+def _enqueue_incoming(message_info):
+    """Queue one webhook message for processing.
+
+    Used for batched deliveries where several events arrive in one POST;
+    invalid, self-sent, and non-text entries are skipped individually.
+    Returns True if the message was queued.
+    """
+    try:
+        key = message_info['key']
+        sender_number = key['remoteJid']
+    except (KeyError, TypeError):
+        logger.warning("Webhook received message without sender information.")
+        return False
+
+    if key.get('fromMe'):
+        logger.info("Ignoring self-sent message: %s", key.get('id'))
+        return False
+
+    incoming_message_text = None
+    msg_content_obj = message_info.get('message')
+    if msg_content_obj:
+        try:
+            incoming_message_text = msg_content_obj['conversation']
+        except KeyError:
+            try:
+                incoming_message_text = msg_content_obj['extendedTextMessage']['text']
+            except KeyError:
+                pass
+
+    if not incoming_message_text:
+        return False
+
+    safe_sender_id = _sanitize_id(sender_number)
+    try:
+        job_queue.put_nowait((sender_number, safe_sender_id, incoming_message_text))
+    except queue.Full:
+        logger.error("Webhook job queue is full; dropping message from %s", sender_number)
+        return False
+    return True
+
+# Canned responses for the webhook hot paths: the bytes never change, so
+# skip jsonify's per-request dict allocation and serialization
+_OK_RESPONSE = Response(b'{"status":"success"}', status=200, mimetype='application/json')
+_SELF_IGNORED_RESPONSE = Response(
+    b'{"status":"success","message":"Self-sent message ignored"}',
+    status=200, mimetype='application/json')
+
+def _all_from_self(raw):
+    """True when every message in the raw webhook body is bot-originated.
+
+    WhatsApp echoes each outbound message back through the webhook, so
+    self-sent events are a large share of traffic. A pair of substring
+    scans on the raw bytes can prove the payload contains only
+    fromMe=true keys without parsing it: if any fromMe=false key (or a
+    spaced variant of either) is present, we fall through to the full
+    parse, so message text that merely mentions the marker can't cause a
+    drop — its own key still carries fromMe=false.
+    """
+    return ((b'"fromMe":true' in raw or b'"fromMe": true' in raw)
+            and b'"fromMe":false' not in raw
+            and b'"fromMe": false' not in raw)
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """Handles incoming WhatsApp messages via webhook using the WaSenderAPI SDK."""
-    try:        
+    try:
         if not wasender_client:
             logger.error("WaSender API client is not initialized. Cannot process webhook.")
             return jsonify({'status': 'error', 'message': 'WaSender client not initialized'}), 500
 
-        data = request.json
+        # Parse the body straight from the raw bytes, skipping Flask's json
+        # codec stack, MIME sniffing, and body cache; every webhook body is
+        # known to be JSON and is only read once.
+        raw = request.get_data(cache=False)
+
+        # Drop pure self-message echoes before spending a JSON parse on them
+        if _all_from_self(raw):
+            logger.info("Ignoring self-sent message batch (raw-byte check).")
+            return _SELF_IGNORED_RESPONSE
+
+        try:
+            data = orjson.loads(raw) if orjson else json.loads(raw)
+        except ValueError:
+            # WaSender can frame events with trailing bytes that strict
+            # parsers reject; salvage the first object and drop the rest
+            try:
+                data, _end = _JSON_DECODER.raw_decode(raw.decode('utf-8', 'replace').lstrip())
+            except ValueError:
+                data = None
+        if not data:
+            return jsonify({'status': 'error', 'message': 'Invalid JSON payload'}), 400
         if data.get('event') == 'messages.upsert' and data.get('data') and data['data'].get('messages'):
                 message_info = data['data']['messages']
-                
+
+                # Providers may deliver several events per POST; process the
+                # whole batch under one request's worth of overhead
+                if isinstance(message_info, list):
+                    for item in message_info:
+                        _enqueue_incoming(item)
+                    return _OK_RESPONSE
+
+                # The payload shape is known, so destructure it EAFP-style
+                # instead of chaining .get(..., {}) calls that allocate a
+                # throwaway dict per lookup
+                try:
+                    key = message_info['key']
+                except KeyError:
+                    logger.warning("Webhook received message without sender information.")
+                    return jsonify({'status': 'error', 'message': 'Incomplete sender data'}), 400
+
                 # Check if it's a message sent by the bot itself
-                if message_info.get('key', {}).get('fromMe'):
-                    logger.info(f"Ignoring self-sent message: {message_info.get('key', {}).get('id')}")
-                    return jsonify({'status': 'success', 'message': 'Self-sent message ignored'}), 200
+                if key.get('fromMe'):
+                    logger.info("Ignoring self-sent message: %s", key.get('id'))
+                    return _SELF_IGNORED_RESPONSE
+
+                try:
+                    sender_number = key['remoteJid']
+                except KeyError:
+                    logger.warning("Webhook received message without sender information.")
+                    return jsonify({'status': 'error', 'message': 'Incomplete sender data'}), 400
 
-                sender_number = message_info.get('key', {}).get('remoteJid')
-                
                 incoming_message_text = None
                 message_type = 'unknown'
 
                 # Extract message content based on message structure
-                if message_info.get('message'):
-                    msg_content_obj = message_info['message']
-                    if 'conversation' in msg_content_obj:
+                msg_content_obj = message_info.get('message')
+                if msg_content_obj:
+                    try:
                         incoming_message_text = msg_content_obj['conversation']
                         message_type = 'text'
-                    elif 'extendedTextMessage' in msg_content_obj and 'text' in msg_content_obj['extendedTextMessage']:
-                        incoming_message_text = msg_content_obj['extendedTextMessage']['text']
-                        message_type = 'text'
+                    except KeyError:
+                        try:
+                            incoming_message_text = msg_content_obj['extendedTextMessage']['text']
+                            message_type = 'text'
+                        except KeyError:
+                            pass
 
-                if not sender_number:
-                    logger.warning("Webhook received message without sender information.")
-                    return jsonify({'status': 'error', 'message': 'Incomplete sender data'}), 400
+                safe_sender_id = _sanitize_id(sender_number)
 
-                safe_sender_id = "".join(c if c.isalnum() else '_' for c in sender_number)
-                
-                # we should do this in queue in production if we take too long to respond the request will timeout
+                # Enqueue the heavy work (Gemini + paced sends) and return
+                # immediately so the webhook never hits WaSender's deadline
                 if message_type == 'text' and incoming_message_text:
-                    conversation_history = load_conversation_history(safe_sender_id)
-                    gemini_reply = get_gemini_response(incoming_message_text, conversation_history)
-                    
-                    if gemini_reply:
-                        message_chunks = split_message(gemini_reply)
-                        print(f"Sending {len(message_chunks)} message chunks to {sender_number}")
-                        for i, chunk in enumerate(message_chunks):
-                            if not send_whatsapp_message(sender_number, chunk, message_type='text'):
-                                logger.error(f"Failed to send message chunk to {sender_number}")
-                                break
-                            # Delay between messages
-                            import random
-                            import time
-                            if i < len(message_chunks) - 1:
-                                delay = random.uniform(5, 7)
-                                time.sleep(delay)
-                        
-                        # Save conversation history
-                        conversation_manager.add_exchange(safe_sender_id, incoming_message_text, gemini_reply)
-            
-                return jsonify({'status': 'success'}), 200
+                    try:
+                        job_queue.put_nowait((sender_number, safe_sender_id, incoming_message_text))
+                    except queue.Full:
+                        logger.error("Webhook job queue is full; dropping message from %s", sender_number)
+                        return jsonify({'status': 'error', 'message': 'Server busy'}), 503
+
+                return _OK_RESPONSE
             
     except Exception as e:
-        logger.error(f"Error processing webhook: {e}")
+        logger.error("Error processing webhook: %s", e)
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 @app.route('/status', methods=['GET'])
 def status():
     """Get status information about the service."""
-    return jsonify({
+    cached = _cached_probe('status')
+    if cached is not None:
+        return cached
+
+    return _store_probe('status', {
         'status': 'active',
         'version': '1.0.0',
         'persona': PERSONA_NAME,
@@ -500,25 +1120,38 @@ def status():
             'conversation_dir': CONFIG["CONVERSATIONS_DIR"],
             'gemini_model': CONFIG["GEMINI_MODEL"],
         }
-    })
+    }, 200)
 
 @app.route('/clear_history/<user_id>', methods=['POST'])
 def clear_history(user_id):
     """Clear conversation history for a user."""
     try:
         # Sanitize user_id to prevent directory traversal
-        safe_user_id = "".join(c if c.isalnum() else '_' for c in user_id)
+        safe_user_id = _sanitize_id(user_id)
         file_path = os.path.join(CONFIG["CONVERSATIONS_DIR"], f"{safe_user_id}.json")
-        
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            logger.info(f"Cleared conversation history for {safe_user_id}")
-            return jsonify({'status': 'success', 'message': f'History cleared for {safe_user_id}'}), 200
-        else:
-            logger.info(f"No conversation history found for {safe_user_id}")
+        log_path = os.path.join(CONFIG["CONVERSATIONS_DIR"], f"{safe_user_id}.jsonl")
+
+        # Drop any pooled chat session so the next turn starts fresh
+        if gemini_client:
+            gemini_client.reset_chat(safe_user_id)
+
+        # EAFP unlink: one syscall instead of a stat-then-remove pair, and
+        # no window for the file to vanish between the two
+        try:
+            os.unlink(log_path)
+        except FileNotFoundError:
+            pass
+
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            logger.info("No conversation history found for %s", safe_user_id)
             return jsonify({'status': 'success', 'message': f'No history found for {safe_user_id}'}), 200
+
+        logger.info("Cleared conversation history for %s", safe_user_id)
+        return jsonify({'status': 'success', 'message': f'History cleared for {safe_user_id}'}), 200
     except Exception as e:
-        logger.error(f"Error clearing history for {user_id}: {e}")
+        logger.error("Error clearing history for %s: %s", user_id, e)
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
 if __name__ == '__main__':
@@ -526,15 +1159,17 @@ if __name__ == '__main__':
     logger.info("======================================================")
     logger.info("  WhatsApp Gemini Chatbot Starting")
     logger.info("======================================================")
-    logger.info(f"Persona: {PERSONA_NAME}")
-    logger.info(f"Gemini Model: {CONFIG['GEMINI_MODEL']}")
-    logger.info(f"Conversations Directory: {CONFIG['CONVERSATIONS_DIR']}")
-    logger.info(f"WaSender API Client: {'Initialized' if wasender_client else 'NOT INITIALIZED'}")
-    logger.info(f"Gemini API Client: {'Initialized' if gemini_client else 'NOT INITIALIZED'}")
-    logger.info(f"Starting Flask server on port 5001...")
+    logger.info("Persona: %s", PERSONA_NAME)
+    logger.info("Gemini Model: %s", CONFIG['GEMINI_MODEL'])
+    logger.info("Conversations Directory: %s", CONFIG['CONVERSATIONS_DIR'])
+    logger.info("WaSender API Client: %s", ('Initialized' if wasender_client else 'NOT INITIALIZED'))
+    logger.info("Gemini API Client: %s", ('Initialized' if gemini_client else 'NOT INITIALIZED'))
+    logger.info("Starting Flask server on port 5001...")
     logger.info("======================================================")
     
     # For development with webhook testing via ngrok
     port = int(os.getenv('PORT', '5001'))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
-    app.run(debug=debug, port=port, host='0.0.0.0')
+    # threaded=True so a webhook waiting on Gemini or sleeping between
+    # chunks doesn't block other requests (use gunicorn gthread in prod)
+    app.run(debug=debug, port=port, host='0.0.0.0', threaded=True)
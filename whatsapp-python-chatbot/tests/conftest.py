@@ -8,45 +8,71 @@ import json
 import tempfile
 from unittest.mock import MagicMock, patch
 
+from wasenderapi import WasenderSyncClient
+
+# Shared across tests: the send result never varies, and building the
+# specced client mock once avoids re-synthesizing its method mocks for
+# every test
+_WASENDER_SEND_RESULT = MagicMock(
+    response=MagicMock(data=MagicMock(message_id="test_message_id")))
+_WASENDER_MOCK = MagicMock(spec_set=WasenderSyncClient)
+
+@pytest.fixture(autouse=True)
+def _clear_probe_cache():
+    """Drop the /health and /status TTL cache between tests.
+
+    Route tests patch CONFIG and expect the next probe to reflect it;
+    without this a cached body from the previous test could be served.
+    """
+    import script
+    script._probe_cache.clear()
+
+@pytest.fixture(scope='session')
+def _conversations_tmpdir():
+    """One storage directory for the whole run instead of one per test.
+
+    Creating and destroying a directory for every test is pure syscall
+    churn; tests stay isolated because mock_env_vars empties it between
+    tests.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield temp_dir
+
 @pytest.fixture
-def mock_env_vars(monkeypatch):
+def mock_env_vars(monkeypatch, _conversations_tmpdir):
     """Mock environment variables used by the application."""
     monkeypatch.setenv("GEMINI_API_KEY", "test_gemini_api_key")
     monkeypatch.setenv("WASENDER_API_TOKEN", "test_wasender_api_token")
     monkeypatch.setenv("WEBHOOK_SECRET", "test_webhook_secret")
     monkeypatch.setenv("GEMINI_MODEL", "gemini-test-model")
-    
-    # Use a temp directory for conversation storage during tests
-    temp_dir = tempfile.mkdtemp()
-    monkeypatch.setenv("CONVERSATIONS_DIR", temp_dir)
-    
-    yield temp_dir
-    
-    # Cleanup temp directories
+
+    # Use the module-scoped temp directory for conversation storage
+    monkeypatch.setenv("CONVERSATIONS_DIR", _conversations_tmpdir)
+
+    yield _conversations_tmpdir
+
+    # Remove files so the next test sees an empty directory
     try:
-        for f in os.listdir(temp_dir):
-            os.remove(os.path.join(temp_dir, f))
-        os.rmdir(temp_dir)
+        for f in os.listdir(_conversations_tmpdir):
+            os.remove(os.path.join(_conversations_tmpdir, f))
     except (OSError, FileNotFoundError):
         pass
 
 @pytest.fixture
 def mock_wasender_client():
-    """Mock wasender client for testing."""
-    client = MagicMock()
-    # Mock methods with appropriate return values
-    client.send_text = MagicMock(return_value=MagicMock(
-        response=MagicMock(
-            data=MagicMock(message_id="test_message_id")
-        )
-    ))
-    client.send_image = MagicMock(return_value=MagicMock(
-        response=MagicMock(
-            data=MagicMock(message_id="test_image_id")
-        )
-    ))
-    client.handle_webhook_event = MagicMock()
-    return client
+    """Mock wasender client for testing.
+
+    One spec_set mock is reused for the whole run: the spec stops
+    MagicMock from lazily creating a child mock per attribute access and
+    fails fast on typo'd method names; the reset between tests clears
+    recorded calls, side effects, and configured return values on the
+    method mocks. Plain attribute assignment is NOT undone by the reset
+    and would leak across tests — use monkeypatch.setattr for that.
+    """
+    _WASENDER_MOCK.reset_mock(return_value=True, side_effect=True)
+    _WASENDER_MOCK.send_text.return_value = _WASENDER_SEND_RESULT
+    _WASENDER_MOCK.send_image.return_value = _WASENDER_SEND_RESULT
+    return _WASENDER_MOCK
 
 @pytest.fixture
 def mock_genai_response():
@@ -78,50 +104,3 @@ def test_persona_file(tmp_path):
     
     return str(persona_path)
 
-@pytest.fixture
-def sample_webhook_message():
-    """Create a sample webhook message payload."""
-    return {
-        "event": "messages.upsert",
-        "data": {
-            "messages": {
-                "key": {
-                    "remoteJid": "1234567890@s.whatsapp.net",
-                    "fromMe": False,
-                    "id": "test_message_id"
-                },
-                "message": {
-                    "conversation": "Hello, chatbot!"
-                }
-            }
-        }
-    }
-
-@pytest.fixture
-def sample_webhook_message_sdk_format():
-    """Create a sample webhook event in SDK format."""
-    from wasenderapi.webhook import WasenderWebhookEvent
-    from enum import Enum
-    
-    class MockEventType(Enum):
-        MESSAGES_UPSERT = 'messages.upsert'
-    
-    event = MagicMock(spec=WasenderWebhookEvent)
-    event.event_type = MockEventType.MESSAGES_UPSERT
-    
-    # Create message structure
-    message = MagicMock()
-    message.key = MagicMock()
-    message.key.remoteJid = "1234567890@s.whatsapp.net"
-    message.key.fromMe = False
-    message.key.id = "test_message_id"
-    message.messageStubType = None
-    
-    message.message = MagicMock()
-    message.message.conversation = "Hello, chatbot!"
-    
-    # Attach messages to event data
-    event.data = MagicMock()
-    event.data.messages = [message]
-    
-    return event
@@ -114,6 +114,92 @@ class TestConversationManager:
         assert loaded_history[2]['parts'][0] == "User message 4"
         assert loaded_history[3]['parts'][0] == "Model response 4"
         
+    def test_add_exchange_appends_to_log(self, mock_env_vars):
+        """Test that add_exchange appends to the JSONL log instead of rewriting."""
+        # Arrange
+        manager = ConversationManager(mock_env_vars)
+        user_id = "test_user"
+        manager.save(user_id, [{'role': 'user', 'parts': ["Hello!"]},
+                               {'role': 'model', 'parts': ["Hi there!"]}])
+        snapshot_path = os.path.join(mock_env_vars, f"{user_id}.json")
+        snapshot_before = open(snapshot_path).read()
+
+        # Act
+        manager.add_exchange(user_id, "How are you?", "Great!")
+
+        # Assert
+        # The snapshot is untouched; the new exchange lives in the side log
+        assert open(snapshot_path).read() == snapshot_before
+        log_path = os.path.join(mock_env_vars, f"{user_id}.jsonl")
+        assert os.path.exists(log_path)
+
+        # A fresh manager (no warm cache) merges snapshot and log
+        fresh = ConversationManager(mock_env_vars)
+        history = fresh.load(user_id)
+        assert len(history) == 4
+        assert history[2]['parts'][0] == "How are you?"
+        assert history[3]['parts'][0] == "Great!"
+
+    def test_add_exchange_compacts_long_history(self, mock_env_vars):
+        """Test that long histories are compacted back into the snapshot."""
+        # Arrange
+        max_history = 2
+        manager = ConversationManager(mock_env_vars, max_history)
+        user_id = "test_user"
+
+        # Act - add enough exchanges to trigger compaction (> max_history * 4 messages)
+        for i in range(5):
+            manager.add_exchange(user_id, f"User message {i}", f"Model response {i}")
+
+        # Assert
+        # Compaction rewrote the snapshot and retired the log
+        log_path = os.path.join(mock_env_vars, f"{user_id}.jsonl")
+        assert not os.path.exists(log_path)
+        loaded_history = manager.load(user_id)
+        assert len(loaded_history) <= max_history * 2
+        assert loaded_history[-1]['parts'][0] == "Model response 4"
+
+    def test_cleared_history_stays_cleared(self, mock_env_vars):
+        """Test that deleting the files also drops the warm cache."""
+        # Arrange
+        manager = ConversationManager(mock_env_vars)
+        user_id = "test_user"
+        manager.add_exchange(user_id, "hello", "hi there")
+
+        # Act - clear the files out from under the warm cache, the way
+        # /clear_history does, then start a new exchange
+        for ext in ('.json', '.jsonl'):
+            path = os.path.join(mock_env_vars, f"{user_id}{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+        history = manager.add_exchange(user_id, "new msg", "new reply")
+
+        # Assert - the cleared exchange must not resurrect
+        assert len(history) == 2
+        assert history[0]['parts'][0] == "new msg"
+        assert manager.load(user_id) == history
+
+    def test_list_users_uses_metadata_index(self, mock_env_vars):
+        """Test that list_users enumerates conversations and reuses the index."""
+        # Arrange
+        manager = ConversationManager(mock_env_vars)
+        manager.save("alice", [{'role': 'user', 'parts': ["Hi"]},
+                               {'role': 'model', 'parts': ["Hello"]}])
+        manager.add_exchange("bob", "Hey", "Hey there!")
+
+        # Act
+        users = manager.list_users()
+
+        # Assert
+        assert users == {"alice": 2, "bob": 2}
+
+        # A second scan with unchanged files serves counts from the index
+        assert manager.list_users() == users
+
+        # Changed files are re-indexed
+        manager.add_exchange("alice", "How are you?", "Great!")
+        assert manager.list_users()["alice"] == 4
+
     def test_load_invalid_json(self, mock_env_vars):
         """Test loading when the file contains invalid JSON."""
         # Arrange
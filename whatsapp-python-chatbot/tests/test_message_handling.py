@@ -10,9 +10,9 @@ class TestMessageHandling:
         """Test splitting an empty message."""
         # Arrange & Act
         result = split_message("")
-        
+
         # Assert
-        assert result == []
+        assert result == ()
     
     def test_short_message(self):
         """Test splitting a message that fits in a single chunk."""
@@ -16,9 +16,9 @@ class TestImprovedMessageSplitting:
         """Test splitting an empty message."""
         # Arrange & Act
         result = split_message("")
-        
+
         # Assert
-        assert result == []
+        assert result == ()
     
     def test_short_message(self):
         """Test splitting a message that fits in a single chunk."""
@@ -154,6 +154,107 @@ class TestImprovedMessageSplitting:
         for line in ["Normal line", "This is a very long line", "Short line", "Final line"]:
             assert line in content
     
+    def test_wrapped_lines_respect_max_chars(self):
+        """Test that every wrapped line stays within max_chars_per_line."""
+        # Arrange
+        message = (
+            "This paragraph has plenty of short words that must be packed "
+            "greedily onto lines without ever exceeding the character limit"
+        )
+
+        # Act
+        result = split_message(message, max_lines=3, max_chars_per_line=25)
+
+        # Assert
+        for chunk in result:
+            for line in chunk.split('\n'):
+                assert len(line) <= 25
+
+        # All words are preserved in order
+        combined_words = '\n'.join(result).split()
+        assert combined_words == message.split()
+
+    def test_fused_backslash_regex_matches_legacy_passes(self):
+        """Test that the fused backslash pass matches the old three-pass behavior."""
+        import re
+        from message_splitter import _strip_backslashes
+
+        samples = [
+            "Line 1\n \\ \nLine 2",
+            " \\ \nLeading backslash removed",
+            "Trailing backslash removed\n \\ ",
+            "No backslashes here\nat all",
+            "\\ \nBoth ends\n\\",
+        ]
+
+        for sample in samples:
+            # Legacy behavior: three sequential re.sub passes
+            expected = re.sub(r'\n\s*\\\s*\n', '\n', sample)
+            expected = re.sub(r'^\s*\\\s*\n', '', expected)
+            expected = re.sub(r'\n\s*\\\s*$', '', expected)
+
+            assert _strip_backslashes(sample) == expected
+
+    def test_cascading_standalone_backslashes_fully_removed(self):
+        """Test that runs of adjacent standalone-backslash lines cascade away.
+
+        Removing one standalone line exposes the next at the text edge, so
+        the pass repeats to a fixpoint. This is deliberately stricter than
+        the legacy three-pass sequence, which could leave a leftover for
+        three or more adjacent standalone lines.
+        """
+        from message_splitter import _strip_backslashes
+
+        assert _strip_backslashes(" \\ \n \\ \nx") == "x"
+        assert _strip_backslashes(" \\ \n \\ \n \\ \nx") == "x"
+        assert _strip_backslashes("x\n \\ \n \\ ") == "x"
+
+    def test_repeated_splits_are_cached(self):
+        """Test that identical inputs hit the memoization cache."""
+        from message_splitter import _split_cached
+
+        _split_cached.cache_clear()
+        message = "A template reply\nsent many times\nby the bot\nword for word"
+
+        first = split_message(message, max_lines=2)
+        second = split_message(message, max_lines=2)
+
+        # Cache hits share the same immutable tuple, no copy per call
+        assert first == second
+        assert first is second
+        assert _split_cached.cache_info().hits == 1
+
+    def test_numba_pack_lines_fallback_and_offsets(self):
+        """Test the optional Numba scanner's fallback and offset output."""
+        from message_splitter_numba import NUMBA_AVAILABLE, pack_lines
+
+        paragraph = "Numba packs these words into greedy lines of bounded width"
+
+        if not NUMBA_AVAILABLE:
+            # Without numba installed, the caller must get None and fall back
+            assert pack_lines(paragraph, 20) is None
+            return
+
+        # Non-ASCII paragraphs always fall back (byte offsets != char offsets)
+        assert pack_lines("héllo wörld " * 10, 20) is None
+
+        offsets = pack_lines(paragraph, 20)
+        lines = [paragraph[s:e] for s, e in offsets]
+        for line in lines:
+            assert len(line) <= 20
+        assert ' '.join(lines).split() == paragraph.split()
+
+        # Over-long words: both paths hard-slice the word and emit the
+        # remainder as its own line, so chunk boundaries are identical
+        # whether or not numba is installed
+        from unittest.mock import patch
+        from message_splitter import _iter_lines
+        long_para = "tiny superduperextralongword here to finish"
+        numba_lines = [long_para[s:e] for s, e in pack_lines(long_para, 10)]
+        with patch('message_splitter._numba_pack_lines', return_value=None):
+            pure_lines = list(_iter_lines(long_para, 10))
+        assert numba_lines == pure_lines
+
     def test_consecutive_empty_lines(self):
         """Test handling of multiple consecutive empty lines."""
         # Arrange
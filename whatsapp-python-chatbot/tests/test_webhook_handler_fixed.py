@@ -2,149 +2,215 @@
 test_webhook_handler_fixed.py - Tests for webhook handler and Flask routes with fixes
 """
 
+import io
 import os
 import json
+import sys
 import pytest
 from unittest.mock import patch, MagicMock
+import script
 from script import webhook, health_check, status, clear_history, app, CONFIG
 
-@pytest.fixture
+# Serialize each payload shape once at import instead of json.dumps-ing an
+# identical dict inside every test body; orjson produces bytes directly
+# when available, mirroring script's guarded import.
+if script.orjson is not None:
+    _dumps = script.orjson.dumps
+else:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+_SINGLE_MSG_BYTES = _dumps({
+    "event": "messages.upsert",
+    "data": {
+        "messages": {
+            "key": {
+                "remoteJid": "1234567890@s.whatsapp.net",
+                "fromMe": False,
+                "id": "test_message_id"
+            },
+            "message": {
+                "conversation": "Hello, chatbot!"
+            }
+        }
+    }
+})
+
+_BATCHED_MSG_BYTES = _dumps({
+    "event": "messages.upsert",
+    "data": {
+        "messages": [
+            {
+                "key": {"remoteJid": "1111@s.whatsapp.net", "fromMe": False, "id": "m1"},
+                "message": {"conversation": "First"}
+            },
+            {
+                "key": {"remoteJid": "2222@s.whatsapp.net", "fromMe": False, "id": "m2"},
+                "message": {"conversation": "Second"}
+            }
+        ]
+    }
+})
+
+_SELF_MSG_BYTES = _dumps({
+    "event": "messages.upsert",
+    "data": {
+        "messages": {
+            "key": {
+                "remoteJid": "1234567890@s.whatsapp.net",
+                "fromMe": True,  # This indicates message from the bot
+                "id": "test_message_id"
+            },
+            "message": {
+                "conversation": "Hello, user!"
+            }
+        }
+    }
+})
+
+def _post_webhook(body_bytes):
+    """POST raw bytes to /webhook by calling the WSGI app directly.
+
+    Skips the test client's EnvironBuilder and Response construction; the
+    webhook tests only look at the status code and one JSON field, so a
+    hand-built environ and a capturing start_response are enough.
+    """
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/webhook',
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body_bytes)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body_bytes),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    captured = {}
+
+    def start_response(status_line, headers, exc_info=None):
+        captured['status'] = int(status_line.split(' ', 1)[0])
+
+    chunks = app.wsgi_app(environ, start_response)
+    body = b''.join(chunks)
+    if hasattr(chunks, 'close'):
+        chunks.close()
+    return captured['status'], json.loads(body)
+
+@pytest.fixture(scope="module")
 def client():
-    """Flask test client fixture."""
+    """Flask test client, shared across the module.
+
+    The app and its module-level state are built once; per-test mutable
+    state (wasender_client, CONFIG) is swapped with patch() inside each
+    test, so sharing the client is safe.
+    """
     with app.test_client() as client:
         yield client
 
 class TestWebhookHandler:
-    def test_webhook_handler_sdk(self, client, mock_wasender_client, sample_webhook_message_sdk_format, mock_env_vars):
+    def test_webhook_handler_sdk(self, mock_wasender_client, mock_env_vars, monkeypatch):
         """Test webhook handler with SDK format."""
         # Arrange
-        with patch('script.wasender_client', mock_wasender_client), \
-             patch('script.get_gemini_response') as mock_get_gemini, \
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        with patch('script.get_gemini_response') as mock_get_gemini, \
              patch('script.send_whatsapp_message') as mock_send_message, \
              patch('script.conversation_manager.add_exchange') as mock_add_exchange:
-            
+
             # Set up the mocks
             mock_get_gemini.return_value = "This is a response from Gemini!"
             mock_send_message.return_value = True
-            
-            # Mock the async function for SDK webhook handling
-            # But don't use pytest.mark.asyncio as it causes issues in this context
-            def mock_handle_webhook(*args, **kwargs):
-                # Just return the event directly instead of trying to run an async function
-                return sample_webhook_message_sdk_format
-            
-            mock_wasender_client.handle_webhook_event = mock_handle_webhook
-            
-            # Act - Note we're using the traditional webhook format instead of SDK
-            # This avoids the async complexities in the test
-            webhook_payload = {
-                "event": "messages.upsert",
-                "data": {
-                    "messages": {
-                        "key": {
-                            "remoteJid": "1234567890@s.whatsapp.net",
-                            "fromMe": False,
-                            "id": "test_message_id"
-                        },
-                        "message": {
-                            "conversation": "Hello, chatbot!"
-                        }
-                    }
-                }
-            }
-            
-            response = client.post('/webhook',
-                                  data=json.dumps(webhook_payload),
-                                  content_type='application/json')
-            
+
+            # Act - the handler parses the raw payload itself and never
+            # awaits the SDK's handle_webhook_event, so no async shim is
+            # needed here
+            status_code, body = _post_webhook(_SINGLE_MSG_BYTES)
+
+            # Wait for the background worker to finish the queued job
+            script.job_queue.join()
+
             # Assert
-            assert response.status_code == 200
-            assert response.json['status'] == 'success'
-    
-    def test_webhook_handler_fallback(self, client, mock_wasender_client, sample_webhook_message):
+            assert status_code == 200
+            assert body['status'] == 'success'
+
+    def test_webhook_handler_fallback(self, mock_wasender_client, monkeypatch):
         """Test webhook handler fallback when SDK handling fails."""
         # Arrange
-        with patch('script.wasender_client', mock_wasender_client), \
-             patch('script.get_gemini_response') as mock_get_gemini, \
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        with patch('script.get_gemini_response') as mock_get_gemini, \
              patch('script.send_whatsapp_message') as mock_send_message, \
              patch('script.conversation_manager.add_exchange') as mock_add_exchange:
             
-            # Mock an error in the SDK handler
-            def mock_handle_webhook(*args, **kwargs):
-                raise Exception("SDK handling failed")
-            
-            mock_wasender_client.handle_webhook_event = mock_handle_webhook
+            # No SDK-handler stub: the route parses the raw payload itself
+            # and never calls handle_webhook_event, and assigning a plain
+            # function onto the session-shared mock would leak into every
+            # later test (reset_mock does not undo attribute assignment)
             mock_get_gemini.return_value = "This is a response from Gemini!"
             mock_send_message.return_value = True
             
             # Act
-            response = client.post('/webhook',
-                                  data=json.dumps(sample_webhook_message),
-                                  content_type='application/json')
-            
+            status_code, body = _post_webhook(_SINGLE_MSG_BYTES)
+
+            # Wait for the background worker to finish the queued job
+            script.job_queue.join()
+
             # Assert
-            assert response.status_code == 200
-            assert response.json['status'] == 'success'
-    
-    def test_webhook_handler_self_message(self, client):
-        """Test webhook handler ignores messages sent by the bot itself."""
+            assert status_code == 200
+            assert body['status'] == 'success'
+
+    def test_webhook_handler_batched_events(self, monkeypatch):
+        """Test that an array of messages in one POST is fully processed."""
         # Arrange
-        # Create a message that's from the bot itself
-        webhook_payload = {
-            "event": "messages.upsert",
-            "data": {
-                "messages": {
-                    "key": {
-                        "remoteJid": "1234567890@s.whatsapp.net",
-                        "fromMe": True,  # This indicates message from the bot
-                        "id": "test_message_id"
-                    },
-                    "message": {
-                        "conversation": "Hello, user!"
-                    }
-                }
-            }
-        }
-        
-        with patch('script.wasender_client', MagicMock()), \
-             patch('script.get_gemini_response') as mock_get_gemini:
-            
+        monkeypatch.setattr(script, 'wasender_client', MagicMock())
+        with patch('script.get_gemini_response') as mock_get_gemini, \
+             patch('script.send_whatsapp_message') as mock_send_message, \
+             patch('script.conversation_manager.add_exchange'):
+
+            mock_get_gemini.return_value = "Batch reply"
+            mock_send_message.return_value = True
+
             # Act
-            response = client.post('/webhook',
-                                  data=json.dumps(webhook_payload),
-                                  content_type='application/json')
-            
+            status_code, body = _post_webhook(_BATCHED_MSG_BYTES)
+
+            # Wait for the background workers to drain both jobs
+            script.job_queue.join()
+
+            # Assert - both events got their own Gemini round trip
+            assert status_code == 200
+            assert body['status'] == 'success'
+            assert mock_get_gemini.call_count == 2
+
+    def test_webhook_handler_self_message(self, monkeypatch):
+        """Test webhook handler ignores messages sent by the bot itself."""
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', MagicMock())
+        with patch('script.get_gemini_response') as mock_get_gemini:
+
+            # Act - _SELF_MSG_BYTES carries fromMe=True, a message from the bot
+            status_code, body = _post_webhook(_SELF_MSG_BYTES)
+
             # Assert - Check that Gemini was not called (since it's a self-message)
+            assert status_code == 200
             assert mock_get_gemini.call_count == 0
-    
-    def test_webhook_handler_error(self, client):
+
+    def test_webhook_handler_error(self, monkeypatch):
         """Test error handling in webhook handler."""
         # Arrange
-        with patch('script.wasender_client', None):  # Force an error by setting client to None
-            webhook_payload = {
-                "event": "messages.upsert",
-                "data": {
-                    "messages": {
-                        "key": {
-                            "remoteJid": "1234567890@s.whatsapp.net",
-                            "fromMe": False,
-                            "id": "test_message_id"
-                        },
-                        "message": {
-                            "conversation": "Hello, chatbot!"
-                        }
-                    }
-                }
-            }
-            
-            # Act
-            response = client.post('/webhook',
-                                  data=json.dumps(webhook_payload),
-                                  content_type='application/json')
-            
-            # Assert
-            assert response.status_code == 500
-            assert response.json['status'] == 'error'
+        # Force an error by setting the client to None
+        monkeypatch.setattr(script, 'wasender_client', None)
+
+        # Act
+        status_code, body = _post_webhook(_SINGLE_MSG_BYTES)
+
+        # Assert
+        assert status_code == 500
+        assert body['status'] == 'error'
 
 class TestFlaskRoutes:
     def test_health_check_ok(self, client):
@@ -157,12 +223,13 @@ class TestFlaskRoutes:
             # Act
             response = client.get('/health')
             
-            # Assert
+            # Assert - parse the body once instead of per response.json access
+            body = response.get_json()
             assert response.status_code == 200
-            assert response.json['status'] == 'ok'
-            assert response.json['wasender_client'] is True
-            assert response.json['gemini_client'] is True
-            assert response.json['conversations_dir'] is True
+            assert body['status'] == 'ok'
+            assert body['wasender_client'] is True
+            assert body['gemini_client'] is True
+            assert body['conversations_dir'] is True
     
     def test_health_check_degraded(self, client):
         """Test health check endpoint when some components are degraded."""
@@ -175,11 +242,12 @@ class TestFlaskRoutes:
             response = client.get('/health')
             
             # Assert
+            body = response.get_json()
             assert response.status_code == 503
-            assert response.json['status'] == 'degraded'
-            assert response.json['wasender_client'] is False
-            assert response.json['gemini_client'] is False
-            assert 'issues' in response.json
+            assert body['status'] == 'degraded'
+            assert body['wasender_client'] is False
+            assert body['gemini_client'] is False
+            assert 'issues' in body
     
     def test_status_endpoint(self, client):
         """Test status endpoint."""
@@ -193,11 +261,12 @@ class TestFlaskRoutes:
             response = client.get('/status')
             
             # Assert
+            body = response.get_json()
             assert response.status_code == 200
-            assert response.json['status'] == 'active'
-            assert response.json['persona'] == 'Test Bot'
-            assert response.json['services']['wasender'] is True
-            assert response.json['services']['gemini'] is True
+            assert body['status'] == 'active'
+            assert body['persona'] == 'Test Bot'
+            assert body['services']['wasender'] is True
+            assert body['services']['gemini'] is True
     
     def test_clear_history(self, client, mock_env_vars):
         """Test clearing conversation history for a user."""
@@ -205,18 +274,20 @@ class TestFlaskRoutes:
         user_id = "test_user"
         safe_user_id = "test_user"
         
-        # Create a conversation file for the test user
+        # Create a conversation file for the test user; write bytes the
+        # same way the conversation manager persists snapshots
         file_path = os.path.join(mock_env_vars, f"{safe_user_id}.json")
-        with open(file_path, 'w') as f:
-            json.dump([], f)
+        with open(file_path, 'wb') as f:
+            f.write(_dumps([]))
         
         with patch('script.CONFIG', {'CONVERSATIONS_DIR': mock_env_vars}):
             # Act
             response = client.post(f'/clear_history/{user_id}')
             
             # Assert
+            body = response.get_json()
             assert response.status_code == 200
-            assert response.json['status'] == 'success'
+            assert body['status'] == 'success'
             assert not os.path.exists(file_path)
     
     def test_clear_history_nonexistent(self, client, mock_env_vars):
@@ -229,6 +300,7 @@ class TestFlaskRoutes:
             response = client.post(f'/clear_history/{user_id}')
             
             # Assert
+            body = response.get_json()
             assert response.status_code == 200
-            assert response.json['status'] == 'success'
-            assert "No history found" in response.json['message']
+            assert body['status'] == 'success'
+            assert "No history found" in body['message']
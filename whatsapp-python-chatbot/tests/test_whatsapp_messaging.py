@@ -1,160 +1,120 @@
-"""
-test_whatsapp_messaging.py - Tests for WhatsApp messaging functionality
-"""
-
-import pytest
-from unittest.mock import patch, MagicMock
-from script import send_whatsapp_message
-
-class TestWhatsAppMessaging:
-    def test_send_text_message(self, mock_wasender_client):
-        """Test sending a text message via the WaSender API."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890@s.whatsapp.net"
-            message = "Hello, this is a test message."
-            
-            # Act
-            result = send_whatsapp_message(recipient, message, message_type='text')
-            
-            # Assert
-            assert result is True
-            mock_wasender_client.send_text.assert_called_once_with(
-                to="1234567890",  # Should strip the @s.whatsapp.net part
-                text_body=message
-            )
-    
-    def test_send_image_message(self, mock_wasender_client):
-        """Test sending an image message via the WaSender API."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890"
-            caption = "Check out this image"
-            media_url = "https://example.com/image.jpg"
-            
-            # Act
-            result = send_whatsapp_message(recipient, caption, message_type='image', media_url=media_url)
-            
-            # Assert
-            assert result is True
-            mock_wasender_client.send_image.assert_called_once_with(
-                to=recipient,
-                url=media_url,
-                caption=caption
-            )
-    
-    def test_send_video_message(self, mock_wasender_client):
-        """Test sending a video message via the WaSender API."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890"
-            caption = "Check out this video"
-            media_url = "https://example.com/video.mp4"
-            
-            # Act
-            result = send_whatsapp_message(recipient, caption, message_type='video', media_url=media_url)
-            
-            # Assert
-            assert result is True
-            mock_wasender_client.send_video.assert_called_once_with(
-                to=recipient,
-                url=media_url,
-                caption=caption
-            )
-    
-    def test_send_audio_message(self, mock_wasender_client):
-        """Test sending an audio message via the WaSender API."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890"
-            message = ""  # Audio doesn't use caption
-            media_url = "https://example.com/audio.mp3"
-            
-            # Act
-            result = send_whatsapp_message(recipient, message, message_type='audio', media_url=media_url)
-            
-            # Assert
-            assert result is True
-            mock_wasender_client.send_audio.assert_called_once_with(
-                to=recipient,
-                url=media_url
-            )
-    
-    def test_send_document_message(self, mock_wasender_client):
-        """Test sending a document message via the WaSender API."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890"
-            caption = "Check out this document"
-            media_url = "https://example.com/document.pdf"
-            
-            # Act
-            result = send_whatsapp_message(recipient, caption, message_type='document', media_url=media_url)
-            
-            # Assert
-            assert result is True
-            mock_wasender_client.send_document.assert_called_once_with(
-                to=recipient,
-                url=media_url,
-                caption=caption
-            )
-    
-    def test_send_message_missing_media_url(self, mock_wasender_client):
-        """Test sending a media message without providing media_url."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890"
-            caption = "This should fail"
-            
-            # Act
-            result = send_whatsapp_message(recipient, caption, message_type='image')
-            
-            # Assert
-            assert result is False
-            mock_wasender_client.send_image.assert_not_called()
-    
-    def test_send_message_unsupported_type(self, mock_wasender_client):
-        """Test sending a message with an unsupported type."""
-        # Arrange
-        with patch('script.wasender_client', mock_wasender_client):
-            recipient = "1234567890"
-            message = "This should fail"
-            
-            # Act
-            result = send_whatsapp_message(recipient, message, message_type='unsupported_type')
-            
-            # Assert
-            assert result is False
-    
-    def test_send_message_wasender_api_error(self, mock_wasender_client):
-        """Test error handling when WaSender API raises an exception."""
-        # Arrange
-        from wasenderapi.errors import WasenderAPIError
-        
-        with patch('script.wasender_client', mock_wasender_client):
-            mock_wasender_client.send_text.side_effect = WasenderAPIError(
-                "Error sending message", 
-                status_code=400
-            )
-            
-            recipient = "1234567890"
-            message = "This should handle the error"
-            
-            # Act
-            result = send_whatsapp_message(recipient, message, message_type='text')
-            
-            # Assert
-            assert result is False
-    
-    def test_send_message_without_wasender_client(self):
-        """Test behavior when wasender_client is not initialized."""
-        # Arrange
-        with patch('script.wasender_client', None):
-            recipient = "1234567890"
-            message = "This should fail"
-            
-            # Act
-            result = send_whatsapp_message(recipient, message, message_type='text')
-            
-            # Assert
-            assert result is False
+"""
+test_whatsapp_messaging.py - Tests for WhatsApp messaging functionality
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from wasenderapi.errors import WasenderAPIError
+import script
+from script import send_whatsapp_message
+
+# Built once at import; the error-path test only needs an instance to use
+# as a side_effect, not a fresh one per run
+_MOCK_API_ERROR = WasenderAPIError("Error sending message", status_code=400)
+
+class TestWhatsAppMessaging:
+    @pytest.mark.parametrize("msg_type,content,media_url,method,expected_kwargs", [
+        ("text", "Hello, this is a test message.", None,
+         "send_text", {"text_body": "Hello, this is a test message."}),
+        ("image", "Check out this image", "https://example.com/image.jpg",
+         "send_image", {"url": "https://example.com/image.jpg", "caption": "Check out this image"}),
+        ("video", "Check out this video", "https://example.com/video.mp4",
+         "send_video", {"url": "https://example.com/video.mp4", "caption": "Check out this video"}),
+        # Audio doesn't use caption
+        ("audio", "", "https://example.com/audio.mp3",
+         "send_audio", {"url": "https://example.com/audio.mp3"}),
+        ("document", "Check out this document", "https://example.com/document.pdf",
+         "send_document", {"url": "https://example.com/document.pdf", "caption": "Check out this document"}),
+    ])
+    def test_send_message_types(self, mock_wasender_client, monkeypatch,
+                                msg_type, content, media_url, method, expected_kwargs):
+        """Test sending each supported message type via the WaSender API.
+
+        The five former per-type tests only differed in the type, caption,
+        and expected SDK method, so one parametrized body covers them all.
+        """
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        recipient = "1234567890@s.whatsapp.net"
+
+        # Act
+        result = send_whatsapp_message(recipient, content, message_type=msg_type, media_url=media_url)
+
+        # Assert
+        assert result is True
+        getattr(mock_wasender_client, method).assert_called_once_with(
+            to="1234567890",  # Should strip the @s.whatsapp.net part
+            **expected_kwargs
+        )
+
+    def test_send_message_group_jid_not_stripped(self, mock_wasender_client, monkeypatch):
+        """Test that only the personal @s.whatsapp.net suffix is stripped."""
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        recipient = "12345-6789@g.us"
+        message = "Hello, group!"
+
+        # Act
+        result = send_whatsapp_message(recipient, message, message_type='text')
+
+        # Assert - the group JID goes to the API untouched
+        assert result is True
+        mock_wasender_client.send_text.assert_called_once_with(
+            to=recipient,
+            text_body=message
+        )
+
+    def test_send_message_missing_media_url(self, mock_wasender_client, monkeypatch):
+        """Test sending a media message without providing media_url."""
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        recipient = "1234567890"
+        caption = "This should fail"
+            
+        # Act
+        result = send_whatsapp_message(recipient, caption, message_type='image')
+            
+        # Assert
+        assert result is False
+        mock_wasender_client.send_image.assert_not_called()
+    
+    def test_send_message_unsupported_type(self, mock_wasender_client, monkeypatch):
+        """Test sending a message with an unsupported type."""
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        recipient = "1234567890"
+        message = "This should fail"
+            
+        # Act
+        result = send_whatsapp_message(recipient, message, message_type='unsupported_type')
+            
+        # Assert
+        assert result is False
+    
+    def test_send_message_wasender_api_error(self, mock_wasender_client, monkeypatch):
+        """Test error handling when WaSender API raises an exception."""
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', mock_wasender_client)
+        mock_wasender_client.send_text.side_effect = _MOCK_API_ERROR
+            
+        recipient = "1234567890"
+        message = "This should handle the error"
+            
+        # Act
+        result = send_whatsapp_message(recipient, message, message_type='text')
+            
+        # Assert
+        assert result is False
+    
+    def test_send_message_without_wasender_client(self, monkeypatch):
+        """Test behavior when wasender_client is not initialized."""
+        # Arrange
+        monkeypatch.setattr(script, 'wasender_client', None)
+        recipient = "1234567890"
+        message = "This should fail"
+            
+        # Act
+        result = send_whatsapp_message(recipient, message, message_type='text')
+            
+        # Assert
+        assert result is False